@@ -0,0 +1,229 @@
+"""
+Adaptive rendering for the single page view. QPdfView renders every page it shows in full quality and
+offers no render options, so every page scrolled past and every zoom step is rendered in full. While
+the user scrolls or zooms, the view is therefore left alone and a fast render of the target page, at a
+reduced resolution and without antialiasing, is shown on top of it. Once the input is idle, the view
+moves to the target in one step and renders it in full quality, the preview stays until that render
+arrives.
+"""
+from PySide6.QtCore import QObject, QTimer, QElapsedTimer, QPoint, QRect, QSize, Qt
+from PySide6.QtGui import QPixmap
+from PySide6.QtPdf import QPdfDocumentRenderOptions, QPdfPageRenderer
+from PySide6.QtPdfWidgets import QPdfView
+from PySide6.QtWidgets import QLabel
+import os
+
+from framestats import FRAME_BUDGET_MS
+
+ALIASED = (QPdfDocumentRenderOptions.RenderFlag.TextAliased | QPdfDocumentRenderOptions.RenderFlag.ImageAliased
+           | QPdfDocumentRenderOptions.RenderFlag.PathAliased)
+# Preview quality tiers, best first: (scale of the displayed resolution, render flags). Previews are
+# rendered in the GUI thread, they start at the first tier and step down while they take more than a
+# quarter of the frame budget.
+RENDER_TIERS = ((0.5, ALIASED), (0.35, ALIASED), (0.25, ALIASED))
+# Pages passed within this time after a preview are not previewed, during a fling they fly by anyway.
+PREVIEW_INTERVAL_MS = 33
+# The view is moved and renders in full quality once there was no scroll or zoom input for this long.
+IDLE_MS = 150
+# Longest time the preview stays after the view moved, if the view shows the page from its own cache
+# no render arrives.
+FULL_QUALITY_WAIT_MS = 500
+
+
+def tiers_from_environment(default=RENDER_TIERS) -> tuple:
+    """
+    Preview tiers set by PDFTOOL_RENDER_TIERS, comma separated resolution scales like "0.5,0.25",
+    "0" turns previews off.
+    :param default: tiers if the variable is not set
+    :return: tuple of (scale, render flags)
+    """
+    value = os.environ.get("PDFTOOL_RENDER_TIERS")
+    if not value:
+        return default
+    return tuple((float(scale), ALIASED) for scale in value.split(",") if float(scale) > 0)
+
+
+def render_options(flags) -> QPdfDocumentRenderOptions:
+    """
+    Render options of a tier. Built once per tier and reused, each call of a QPdfDocumentRenderOptions
+    setter drops a reference to None in PySide6 6.12, which crashes the interpreter after enough renders.
+    :param flags: render flags
+    :return: QPdfDocumentRenderOptions
+    """
+    options = QPdfDocumentRenderOptions()
+    options.setRenderFlags(flags)
+    return options
+
+
+class AdaptiveRender(QObject):
+    """
+    Low quality previews for a QPdfView during scrolling and zooming. preview() shows the target page
+    and zoom, the view itself is moved once the input is idle. Render times of the previews are
+    collected per tier. Without tiers the view is moved right away.
+    """
+    def __init__(self, view, tiers=None, idle_ms=IDLE_MS, parent=None):
+        super().__init__(parent)
+        self.view = view
+        self.tiers = tiers_from_environment() if tiers is None else tiers
+        self.page = None
+        self.zoom = None
+        self.label = QLabel(view.viewport())
+        self.label.setAlignment(Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignTop)
+        self.label.setAutoFillBackground(True)
+        self.label.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.label.hide()
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.setInterval(idle_ms)
+        self.idle_timer.timeout.connect(self.settle)
+        self.hide_timer = QTimer(self)
+        self.hide_timer.setSingleShot(True)
+        self.hide_timer.setInterval(FULL_QUALITY_WAIT_MS)
+        self.hide_timer.timeout.connect(self.label.hide)
+        # the view renders through its own page renderer, its results end the preview
+        renderer = view.findChild(QPdfPageRenderer)
+        if renderer is not None:
+            renderer.pageRendered.connect(self.full_quality_rendered)
+        self.awaited_page = None
+        self.last_preview = QElapsedTimer()
+        self.render_times = {}
+        self.settles = 0
+
+    @property
+    def tiers(self) -> tuple:
+        return self._tiers
+
+    @tiers.setter
+    def tiers(self, tiers):
+        self._tiers = tuple(tiers)
+        self.tier_options = [render_options(flags) for _, flags in self._tiers]
+        self.tier = 0
+
+    @property
+    def pending(self) -> bool:
+        return self.idle_timer.isActive()
+
+    def target_page(self) -> int:
+        """
+        Page the view is going to show.
+        :return: page
+        """
+        return self.page if self.page is not None else self.view.pageNavigator().currentPage()
+
+    def target_zoom(self) -> float:
+        """
+        Zoom factor the view is going to show.
+        :return: zoom factor
+        """
+        return self.zoom if self.zoom is not None else self.view.zoomFactor()
+
+    def display_size(self, page, zoom=None) -> QSize:
+        """
+        Size the view shows a page at, like QPdfView lays it out.
+        :param page:
+        :param zoom: custom zoom factor, None for the zoom of the view
+        :return: size in pixels
+        """
+        point_size = self.view.document().pagePointSize(page)
+        if zoom is None and self.view.zoomMode() != QPdfView.ZoomMode.Custom:
+            margins = self.view.documentMargins()
+            available = self.view.viewport().size().shrunkBy(margins)
+            if self.view.zoomMode() == QPdfView.ZoomMode.FitToWidth:
+                return point_size.scaled(available.width(), 1e9, Qt.AspectRatioMode.KeepAspectRatio).toSize()
+            return point_size.scaled(available.toSizeF(), Qt.AspectRatioMode.KeepAspectRatio).toSize()
+        factor = zoom if zoom is not None else self.view.zoomFactor()
+        return (point_size * factor * self.view.logicalDpiX() / 72).toSize()
+
+    def preview(self, page, zoom=None):
+        """
+        Show a fast render of a page on top of the view and move the view there once the input is idle.
+        :param page:
+        :param zoom: new zoom factor, None keeps the zoom
+        :return: None
+        """
+        self.page = page
+        if zoom is not None:
+            self.zoom = zoom
+        document = self.view.document()
+        if not self.tiers or document is None or not 0 <= page < document.pageCount():
+            self.settle()
+            return
+        self.idle_timer.start()
+        if self.last_preview.isValid() and self.last_preview.elapsed() < PREVIEW_INTERVAL_MS:
+            return
+        self.last_preview.start()
+        scale = self.tiers[self.tier][0]
+        displayed = self.display_size(page, self.zoom)
+        visible = displayed.boundedTo(self.view.viewport().size())
+        timer = QElapsedTimer()
+        timer.start()
+        image = document.render(page, displayed * scale, self.tier_options[self.tier])
+        if visible != displayed:
+            # pages larger than the viewport are cut to the visible part, centered like the view
+            image = image.copy(QRect(QPoint(int((displayed.width() - visible.width()) / 2 * scale), 0),
+                                     visible * scale))
+        elapsed = timer.nsecsElapsed() / 1e6
+        self.render_times.setdefault(scale, []).append(elapsed)
+        self.adapt(elapsed)
+        self.hide_timer.stop()
+        self.awaited_page = None
+        self.label.setGeometry(self.view.viewport().rect())
+        self.label.setPixmap(QPixmap.fromImage(image).scaled(visible, Qt.AspectRatioMode.IgnoreAspectRatio,
+                                                             Qt.TransformationMode.FastTransformation))
+        self.label.show()
+        self.label.raise_()
+
+    def adapt(self, elapsed):
+        # step down a tier while previews take more than a quarter frame, back up below an eighth
+        if elapsed > FRAME_BUDGET_MS / 4 and self.tier + 1 < len(self.tiers):
+            self.tier += 1
+        elif elapsed < FRAME_BUDGET_MS / 8 and self.tier > 0:
+            self.tier -= 1
+
+    def settle(self):
+        """
+        Move the view to the previewed page and zoom, the view renders them in full quality.
+        :return: None
+        """
+        self.idle_timer.stop()
+        page, zoom = self.page, self.zoom
+        self.page = None
+        self.zoom = None
+        document = self.view.document()
+        moved = False
+        if zoom is not None and (self.view.zoomMode() != QPdfView.ZoomMode.Custom or self.view.zoomFactor() != zoom):
+            self.view.setZoomMode(QPdfView.ZoomMode.Custom)
+            self.view.setZoomFactor(zoom)
+            moved = True
+        navigator = self.view.pageNavigator()
+        if (page is not None and document is not None and 0 <= page < document.pageCount()
+                and page != navigator.currentPage()):
+            navigator.jump(page, QPoint(), navigator.currentZoom())
+            moved = True
+        if page is not None or zoom is not None:
+            self.settles += 1
+        if moved and self.label.isVisible():
+            self.awaited_page = navigator.currentPage()
+            self.hide_timer.start()
+        else:
+            self.label.hide()
+
+    def full_quality_rendered(self, page, *args):
+        if page == self.awaited_page and not self.pending:
+            self.hide_timer.stop()
+            self.awaited_page = None
+            self.label.hide()
+
+    def stats(self) -> dict:
+        """
+        Render times of the previews.
+        :return: dict with the current tier, the number of full quality passes and per tier scale the
+            number of previews, mean and worst render time in ms
+        """
+        return {"tier": self.tier,
+                "settles": self.settles,
+                "tiers": {scale: {"previews": len(times),
+                                  "mean_ms": sum(times) / len(times),
+                                  "max_ms": max(times)}
+                          for scale, times in self.render_times.items()},
+                }
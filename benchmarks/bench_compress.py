@@ -0,0 +1,52 @@
+"""
+Benchmark compact output, compares size and write time of classic files with files using object streams
+and a cross-reference stream, for several object stream sizes.
+
+Run with: python benchmarks/bench_compress.py [--pages 1000 10000] [--objects-per-stream 10 100 1000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pypdf import PdfReader, PdfWriter  # noqa: E402
+
+import pdftools  # noqa: E402
+from bench_raster import build_document  # noqa: E402
+
+
+def write_copy(pdf_tools, reader, filename) -> float:
+    # a saved copy of the whole document, like saving with changed metadata
+    writer = PdfWriter()
+    writer.append_pages_from_reader(reader)
+    writer.add_metadata({"/Title": "Benchmark"})
+    start = time.perf_counter()
+    pdf_tools.write_pdf(writer, filename, "save")
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--objects-per-stream", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+    pdf_tools = pdftools.PdfTools()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output = os.path.join(temp_dir, 'output.pdf')
+        for pages in args.pages:
+            filename = os.path.join(temp_dir, f'compress_{pages}.pdf')
+            build_document(filename, pages)
+            reader = PdfReader(filename)
+            for objects_per_stream in [0] + args.objects_per_stream:
+                pdf_tools.object_streams["save"] = objects_per_stream
+                duration = write_copy(pdf_tools, reader, output)
+                size_kb = os.path.getsize(output) / 1024
+                start = time.perf_counter()
+                len(PdfReader(output).pages)
+                parse = time.perf_counter() - start
+                label = f'{objects_per_stream} per stream' if objects_per_stream else 'classic'
+                print(f'{pages:>6} pages  {label:>16}  {size_kb:9.1f} KB  write {duration * 1000:8.1f} ms  '
+                      f'parse {parse * 1000:8.1f} ms')
@@ -0,0 +1,106 @@
+"""
+Benchmark opening a document for viewing and editing, compares parsing the file separately in pypdf and QtPdf
+with the SharedDocument both engines read from. Every open runs in its own process, the resident memory
+is measured after opening. Linux only (reads /proc/self/statm).
+
+Run with: python benchmarks/bench_open.py [--pages 1000 10000] [--image-kb 200] [--file FILE]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pypdf import PdfReader, PdfWriter  # noqa: E402
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject, NumberObject  # noqa: E402
+
+from bench_raster import build_document  # noqa: E402
+
+
+def add_images(filename, image_kb):
+    # scanned documents are mostly image data, give every page an image of random bytes
+    reader = PdfReader(filename)
+    writer = PdfWriter()
+    for page in reader.pages:
+        page = writer.add_page(page)
+        image = DecodedStreamObject()
+        image.set_data(os.urandom(image_kb * 1024))
+        image.update({NameObject("/Type"): NameObject("/XObject"), NameObject("/Subtype"): NameObject("/Image"),
+                      NameObject("/Width"): NumberObject(1), NameObject("/Height"): NumberObject(1),
+                      NameObject("/BitsPerComponent"): NumberObject(8),
+                      NameObject("/ColorSpace"): NameObject("/DeviceGray"),
+                      NameObject("/Filter"): NameObject("/DCTDecode")})
+        resources = page.setdefault(NameObject("/Resources"), DictionaryObject()).get_object()
+        resources[NameObject("/XObject")] = DictionaryObject({NameObject("/Scan"): writer._add_object(image)})
+    with open(filename, "wb") as fp:
+        writer.write(fp)
+
+
+def rss() -> int:
+    with open("/proc/self/statm") as fp:
+        return int(fp.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def open_separate(filename) -> dict:
+    # the former way: pypdf reads the file into memory, QtPdf reads it again and provides the metadata
+    from PySide6.QtPdf import QPdfDocument
+    reader = PdfReader(filename)
+    version = reader.pdf_header
+    pages = len(reader.pages)
+    document = QPdfDocument(None)
+    document.load(filename)
+    title = document.metaData(QPdfDocument.MetaDataField.Title)
+    return {"objects": (reader, document), "pages": pages, "version": version, "title": title}
+
+
+def open_shared(filename) -> dict:
+    from PySide6.QtPdf import QPdfDocument
+    from shareddocument import SharedDocument
+    shared = SharedDocument.open(filename)
+    info = shared.info
+    device = shared.device()
+    document = QPdfDocument(None)
+    document.load(device)
+    return {"objects": (shared, device, document), "pages": info["page_count"], "version": info["version"],
+            "title": info["metadata"].get("/Title", "")}
+
+
+def measure(mode, filename):
+    import raster
+    raster.ensure_application()
+    baseline = rss()
+    start = time.perf_counter()
+    result = (open_shared if mode == "shared" else open_separate)(filename)
+    duration = time.perf_counter() - start
+    print(json.dumps({"seconds": duration, "rss": rss() - baseline, "pages": result["pages"]}))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--measure":
+        measure(sys.argv[2], sys.argv[3])
+        sys.exit()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--image-kb", type=int, default=0, help="add an image of this size to every page")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # no persistent index, both ways parse the file in full
+        environment = dict(os.environ, PDFTOOL_INDEX_DIR=os.path.join(temp_dir, 'index'))
+        for pages in [None] if args.file else args.pages:
+            filename = args.file or os.path.join(temp_dir, f'open_{pages}.pdf')
+            if not args.file:
+                build_document(filename, pages)
+                if args.image_kb:
+                    add_images(filename, args.image_kb)
+            size_mb = os.path.getsize(filename) / 1024 / 1024
+            for mode in ("separate", "shared"):
+                output = subprocess.run([sys.executable, __file__, "--measure", mode, filename], env=environment,
+                                        capture_output=True, text=True, check=True).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                print(f'{result["pages"]:>6} pages {size_mb:7.1f} MB  {mode:>8}  '
+                      f'open {result["seconds"] * 1000:8.1f} ms  RSS +{result["rss"] / 1024 / 1024:7.1f} MB')
@@ -0,0 +1,48 @@
+"""
+Benchmark page image export, reports pages per second by resolution.
+
+Run with: python benchmarks/bench_raster.py [--file FILE] [--pages 200] [--dpi 72 150 300] [--workers N]
+Without --file a document is generated from the sample document.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pypdf import PdfReader, PdfWriter  # noqa: E402
+
+import pdftools  # noqa: E402
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Lorem Ipsum.pdf')
+
+
+def build_document(filename, pages):
+    reader = PdfReader(SAMPLE)
+    writer = PdfWriter()
+    for number in range(pages):
+        writer.add_page(reader.pages[number % len(reader.pages)])
+    with open(filename, "wb") as fp:
+        writer.write(fp)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--dpi", type=int, nargs="+", default=[72, 150, 300])
+    parser.add_argument("--format", default="PNG")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    pdf_tools = pdftools.PdfTools()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        filename = args.file
+        if not filename:
+            filename = os.path.join(temp_dir, 'bench.pdf')
+            build_document(filename, args.pages)
+        for dpi in args.dpi:
+            output = os.path.join(temp_dir, f'images_{dpi}')
+            os.mkdir(output)
+            print(pdf_tools.export_page_images(filename, output, dpi=dpi, image_format=args.format,
+                                               workers=args.workers))
@@ -0,0 +1,54 @@
+"""
+Benchmark saving, compares rewriting all pages with the byte copy of an unchanged document and the
+incremental update of changed metadata.
+
+Run with: python benchmarks/bench_save.py [--pages 1000 10000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pypdf import PdfWriter  # noqa: E402
+
+import pdftools  # noqa: E402
+from bench_raster import build_document  # noqa: E402
+
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def rewrite(pdf_tools, filename, save_filename, pdf_meta):
+    # the former save_pdf: copy every page into a new writer
+    writer = PdfWriter()
+    writer.append_pages_from_reader(pdf_tools.open_reader(filename))
+    writer.add_metadata(pdf_meta)
+    pdf_tools.write_pdf(writer, save_filename)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[1000, 10000])
+    args = parser.parse_args()
+    pdf_tools = pdftools.PdfTools()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        save_filename = os.path.join(temp_dir, 'saved.pdf')
+        for pages in args.pages:
+            filename = os.path.join(temp_dir, f'save_{pages}.pdf')
+            build_document(filename, pages)
+            # the document is open in the application, parsing is not part of saving
+            reader = pdf_tools.open_reader(filename)
+            pdf_meta = {key: str(value) for key, value in (reader.metadata or {}).items()}
+            changed_meta = dict(pdf_meta, **{"/Title": "Changed title"})
+            full = timed(lambda: rewrite(pdf_tools, filename, save_filename, changed_meta))
+            unchanged = timed(lambda: pdf_tools.save_pdf(filename, save_filename, pdf_meta))
+            metadata = timed(lambda: pdf_tools.save_pdf(filename, save_filename, changed_meta))
+            size_mb = os.path.getsize(filename) / 1024 / 1024
+            print(f'{pages:>6} pages {size_mb:7.1f} MB  rewrite {full * 1000:8.1f} ms  '
+                  f'unchanged {unchanged * 1000:6.1f} ms  metadata {metadata * 1000:6.1f} ms')
@@ -0,0 +1,63 @@
+"""
+Benchmark the metadata scanner against a full parse of every file.
+
+Run with: python benchmarks/bench_scan.py [--corpus FOLDER] [--files 10000] [--workers N]
+Without --corpus a temporary corpus of copies of the sample document is generated.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pypdf import PdfReader  # noqa: E402
+
+import scanner  # noqa: E402
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Lorem Ipsum.pdf')
+
+
+def full_parse(path):
+    """
+    Parse the file the way the application does when a document is opened.
+    """
+    reader = PdfReader(path)
+    for page in reader.pages:
+        page.get("/Annots")
+    return len(reader.pages), reader.metadata
+
+
+def build_corpus(folder, files):
+    for number in range(files):
+        shutil.copyfile(SAMPLE, os.path.join(folder, f'doc_{number:05d}.pdf'))
+
+
+def timed(label, func, paths, workers):
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for _ in executor.map(func, paths, chunksize=64):
+            pass
+    duration = time.perf_counter() - start
+    print(f'{label:<12} {len(paths):>6} files  {duration:8.2f} s  {len(paths) / duration:10.1f} files/s')
+    return duration
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus")
+    parser.add_argument("--files", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        corpus = args.corpus
+        if not corpus:
+            corpus = temp_dir
+            build_corpus(corpus, args.files)
+        paths = list(scanner.find_pdf_files(corpus))
+        scan_time = timed('scan', scanner.scan_file, paths, args.workers)
+        full_time = timed('full parse', full_parse, paths, args.workers)
+        print(f'speedup: {full_time / scan_time:.1f}x')
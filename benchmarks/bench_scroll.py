@@ -0,0 +1,67 @@
+"""
+Fling through a long document in the multi-page view and count dropped frames in both views.
+The single page view follows with low quality previews, "--tiers 0" makes it render every page
+it jumps to in full quality for comparison.
+
+Run with: python benchmarks/bench_scroll.py [--pages 1000] [--step 400] [--tiers 0.5,0.35,0.25]
+Runs offscreen unless QT_QPA_PLATFORM is set.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import QTimer  # noqa: E402
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+from adaptiverender import ALIASED  # noqa: E402
+from bench_raster import build_document  # noqa: E402
+from framestats import FrameStats  # noqa: E402
+import main  # noqa: E402
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--step", type=int, default=400, help="scroll distance per frame in pixels")
+    parser.add_argument("--tiers", help="preview resolution scales, 0 for full quality only")
+    args = parser.parse_args()
+    app = QApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        filename = os.path.join(temp_dir, 'scroll.pdf')
+        build_document(filename, args.pages)
+        window = main.MainWindow()
+        window.resize(920, 1050)
+        window.show()
+        if args.tiers:
+            window.adaptive_render.tiers = tuple((float(scale), ALIASED) for scale in args.tiers.split(",")
+                                                 if float(scale) > 0)
+        window.filename = window.pdf_tools.create_temporary_copy(filename)
+        window.pdf_document.load(window.filename)
+        stats = {name: FrameStats(view) for name, view in (("pagesView", window.ui.pagesView),
+                                                           ("pdfView", window.ui.pdfView))}
+        jumps = []
+        window.ui.pdfView.pageNavigator().currentPageChanged.connect(jumps.append)
+        scroll_bar = window.ui.pagesView.verticalScrollBar()
+
+        def fling():
+            if scroll_bar.value() >= scroll_bar.maximum():
+                app.quit()
+                return
+            scroll_bar.setValue(scroll_bar.value() + args.step)
+            QTimer.singleShot(16, fling)
+
+        def start():
+            for frame_stats in stats.values():
+                frame_stats.reset()
+            fling()
+
+        QTimer.singleShot(500, start)
+        app.exec()
+        print(f'{args.pages} pages, single page view jumps: {len(jumps)}')
+        for name, frame_stats in stats.items():
+            print(name, frame_stats.stats())
+        print("previews", window.adaptive_render.stats())
@@ -0,0 +1,37 @@
+"""
+Benchmark stamping including writing the stamped file, reports time, pages per second, output growth and peak memory.
+
+Run with: python benchmarks/bench_stamp.py [--pages 1000 10000]
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdftools  # noqa: E402
+from bench_raster import build_document  # noqa: E402
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[1000, 10000])
+    args = parser.parse_args()
+    pdf_tools = pdftools.PdfTools()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for pages in args.pages:
+            filename = os.path.join(temp_dir, f'stamp_{pages}.pdf')
+            build_document(filename, pages)
+            size = os.path.getsize(filename)
+            start = time.perf_counter()
+            pdf_tools.stamp(filename, "COPY", {})
+            # stamped documents up to memory_limit are kept in memory, write them out like saving does
+            pdf_tools.flush_working(filename)
+            duration = time.perf_counter() - start
+            growth = os.path.getsize(filename) - size
+            peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(f'{pages:>6} pages  {duration:7.2f} s  {pages / duration:8.1f} pages/s  '
+                  f'+{growth / pages:6.1f} bytes/page  peak RSS {peak_mb:.0f} MB')
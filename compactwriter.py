@@ -0,0 +1,100 @@
+"""
+Compact output for PdfWriter. pypdf writes every object on its own with a classic cross-reference table.
+Here objects without a stream are packed into compressed object streams and the cross-reference table
+is written as a compressed cross-reference stream (PDF 1.5). Dictionaries of pages, annotations, fonts
+and outlines make up most of the uncompressed bytes of typical documents.
+"""
+from pypdf.generic import StreamObject
+import zlib
+
+# Objects packed into one object stream. Larger streams compress better but have to be inflated
+# as a whole by a reader looking for a single object.
+OBJECTS_PER_STREAM = 100
+
+
+def object_stream(objects, level) -> tuple:
+    """
+    Serialize objects into the data of an object stream.
+    :param objects: list of (object number, object)
+    :param level: zlib compression level
+    :return: (compressed data, offset of the first object)
+    """
+    header = []
+    body = bytearray()
+    for number, obj in objects:
+        header.append(f'{number} {len(body)}')
+        buffer = _Buffer()
+        obj.write_to_stream(buffer)
+        body += buffer.data + b'\n'
+    head = ' '.join(header).encode() + b'\n'
+    return zlib.compress(head + bytes(body), level), len(head)
+
+
+class _Buffer:
+    # minimal stream for write_to_stream, faster than BytesIO for many small writes
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data += data
+
+
+def write_compact(writer, stream, objects_per_stream=OBJECTS_PER_STREAM, level=6):
+    """
+    Write a PdfWriter with object streams and a cross-reference stream. Encrypted and incremental
+    writers are written as usual.
+    :param writer: PdfWriter
+    :param stream: binary file object
+    :param objects_per_stream: objects per object stream
+    :param level: zlib compression level for object and cross-reference streams
+    :return: None
+    """
+    if writer._encryption or writer.incremental:
+        writer.write(stream)
+        return
+    writer._resolve_links()
+    header = max(writer.pdf_header, "%PDF-1.5")
+    stream.write(header.encode() + b'\n%\xE2\xE3\xCF\xD3\n')
+    # cross-reference entries: (type, field 2, field 3), type 0 free, 1 in file, 2 in object stream
+    entries = [(0, 0, 65535)]
+    packed = []
+    for number, obj in enumerate(writer._objects, start=1):
+        if obj is None:
+            entries.append((0, 0, 1))
+        elif isinstance(obj, StreamObject):
+            entries.append((1, stream.tell(), 0))
+            stream.write(f'{number} 0 obj\n'.encode())
+            obj.write_to_stream(stream)
+            stream.write(b'\nendobj\n')
+        else:
+            entries.append(None)
+            packed.append((number, obj))
+    next_number = len(entries)
+    for start in range(0, len(packed), objects_per_stream):
+        batch = packed[start:start + objects_per_stream]
+        data, first = object_stream(batch, level)
+        for index, (number, _) in enumerate(batch):
+            entries[number] = (2, next_number, index)
+        entries.append((1, stream.tell(), 0))
+        stream.write(f'{next_number} 0 obj\n<< /Type /ObjStm /N {len(batch)} /First {first} '
+                     f'/Filter /FlateDecode /Length {len(data)} >>\nstream\n'.encode())
+        stream.write(data)
+        stream.write(b'\nendstream\nendobj\n')
+        next_number += 1
+    xref_location = stream.tell()
+    entries.append((1, xref_location, 0))
+    width = max(1, (max(field for _, field, _ in entries).bit_length() + 7) // 8)
+    rows = b''.join(kind.to_bytes(1, "big") + field.to_bytes(width, "big") + extra.to_bytes(2, "big")
+                    for kind, field, extra in entries)
+    data = zlib.compress(rows, level)
+    trailer = f'/Root {writer.root_object.indirect_reference.idnum} 0 R'
+    if writer._info is not None:
+        trailer += f' /Info {writer._info.indirect_reference.idnum} 0 R'
+    if writer._ID is not None:
+        buffer = _Buffer()
+        writer._ID.write_to_stream(buffer)
+        trailer += ' /ID ' + buffer.data.decode("latin-1")
+    stream.write(f'{next_number} 0 obj\n<< /Type /XRef /Size {len(entries)} /W [1 {width} 2] {trailer} '
+                 f'/Filter /FlateDecode /Length {len(data)} >>\nstream\n'.encode("latin-1"))
+    stream.write(data)
+    stream.write(f'\nendstream\nendobj\nstartxref\n{xref_location}\n%%EOF\n'.encode())
@@ -0,0 +1,73 @@
+import itertools
+
+# Window attributes that belong to the document of a tab, swapped in and out when the active tab changes.
+TAB_STATE = ("pdf_tools", "pdf_document", "pdf_buffer", "document_bytes", "filename", "path", "pdf_version",
+             "pdf_title", "pdf_creator", "pdf_author", "pdf_producer", "pdf_subject")
+
+# Increasing counter marking when a tab was last active, used for LRU eviction.
+usage_clock = itertools.count()
+
+
+class DocumentTab:
+    """
+    State of one open document: its PdfTools, the QtPdf document shown in the views and the current page.
+    While a tab is active its state lives in the window, a background tab holds it here. Background tabs
+    can be evicted to free memory, their edits are flushed to the working copy on disk and the loaded
+    document is closed. An evicted tab is loaded again when it becomes active.
+    """
+    def __init__(self, title):
+        self.title = title
+        self.page = 0
+        self.loaded = True
+        self.last_used = next(usage_clock)
+        for name in TAB_STATE:
+            setattr(self, name, None)
+
+    def save(self, window):
+        """
+        Take over the document state from the window.
+        :param window: MainWindow
+        :return: None
+        """
+        for name in TAB_STATE:
+            setattr(self, name, getattr(window, name))
+        self.page = window.ui.pdfView.pageNavigator().currentPage()
+
+    def restore(self, window):
+        """
+        Hand the document state to the window.
+        :param window: MainWindow
+        :return: None
+        """
+        for name in TAB_STATE:
+            setattr(window, name, getattr(self, name))
+        self.last_used = next(usage_clock)
+
+    def memory(self) -> int:
+        """
+        Estimated memory held by the tab: the loaded document and the PdfTools working document.
+        :return: bytes
+        """
+        return (self.document_bytes or 0) + self.pdf_tools.memory_usage()
+
+    def evict(self):
+        """
+        Free the memory of a background tab. The undo history is kept.
+        :return: None
+        """
+        if self.filename:
+            self.pdf_tools.flush_working(self.filename)
+            self.pdf_tools.reader_cache.invalidate(self.filename)
+        self.pdf_tools.release_model()
+        self.pdf_tools.reader = None
+        # the last written document and the last annotation still refer to parsed objects
+        self.pdf_tools.writer = None
+        self.pdf_tools.obj = None
+        self.pdf_tools.annotation = None
+        self.pdf_tools.document = None
+        self.pdf_document.close()
+        if self.pdf_buffer:
+            self.pdf_buffer.deleteLater()
+        self.pdf_buffer = None
+        self.document_bytes = 0
+        self.loaded = False
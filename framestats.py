@@ -0,0 +1,41 @@
+from PySide6.QtCore import QObject, QEvent, QElapsedTimer
+
+# Frame budget at 60 Hz in milliseconds.
+FRAME_BUDGET_MS = 1000 / 60
+
+
+class FrameStats(QObject):
+    """
+    Collect frame times of a widget by watching the paint events of its viewport. A frame taking
+    longer than 1.5 frame budgets counts as dropped. Only meaningful while the view is repainted
+    continuously, e.g. during a scroll, idle time between paints is counted as well.
+    """
+    def __init__(self, widget, parent=None):
+        super().__init__(parent)
+        self.widget = widget
+        self.frame_times = []
+        self.timer = QElapsedTimer()
+        widget.viewport().installEventFilter(self)
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Type.Paint:
+            if self.timer.isValid():
+                self.frame_times.append(self.timer.nsecsElapsed() / 1e6)
+            self.timer.start()
+        return False
+
+    def reset(self):
+        self.frame_times.clear()
+        self.timer.invalidate()
+
+    def stats(self) -> dict:
+        """
+        Summary of the collected frame times.
+        :return: dict with frame count, dropped frames, mean and worst frame time in ms
+        """
+        frames = len(self.frame_times)
+        return {"frames": frames,
+                "dropped": sum(1 for frame_time in self.frame_times if frame_time > 1.5 * FRAME_BUDGET_MS),
+                "mean_ms": sum(self.frame_times) / frames if frames else 0.0,
+                "max_ms": max(self.frame_times, default=0.0),
+                }
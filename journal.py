@@ -0,0 +1,165 @@
+import tempfile
+import hashlib
+import json
+import uuid
+import time
+import os
+
+
+def journal_folder() -> str:
+    """
+    Folder for operation journals, next to the temporary working copies (PDFTOOL_TMPDIR).
+    :return: path
+    """
+    folder = os.path.join(os.environ.get("PDFTOOL_TMPDIR") or tempfile.gettempdir(), 'pdftool-journal')
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def process_alive(pid) -> bool:
+    """
+    Check whether a process is still running. Only supported on POSIX systems, elsewhere
+    every other process counts as ended.
+    :param pid:
+    :return: True if running
+    """
+    if pid == os.getpid():
+        return True
+    if os.name != 'posix' or not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def file_identity(filename) -> dict:
+    """
+    Size, modification time and content hash of a file, to tell whether a journal still applies to it.
+    :param filename:
+    :return: dict with size, mtime_ns and sha256
+    """
+    stat = os.stat(filename)
+    digest = hashlib.sha256()
+    with open(filename, "rb") as fp:
+        for block in iter(lambda: fp.read(1024 * 1024), b""):
+            digest.update(block)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+
+
+class Journal:
+    """
+    Append-only journal of the edits made to a document. The first line names the original file and its
+    identity, every following line is one operation as compact JSON. Lines are flushed to disk as they are written, so
+    after a crash the session can be rebuilt by replaying the operations against the original file.
+    """
+    def __init__(self, original, path=None, operations=None, pid=None, identity=None):
+        self.original = os.path.abspath(original)
+        # process that wrote the journal, None for journals without a recorded process
+        self.pid = os.getpid() if path is None else pid
+        # identity of the original when the journal was started, None for journals without one
+        self.identity = file_identity(self.original) if path is None else identity
+        self.operations = operations or []
+        if path is None:
+            path = os.path.join(journal_folder(), f'{uuid.uuid4().hex}.journal')
+            with open(path, "w", encoding="utf-8") as fp:
+                fp.write(self._header() + "\n")
+        self.path = path
+
+    def _header(self) -> str:
+        return json.dumps({"original": self.original, "started": time.time(), "pid": self.pid,
+                           "identity": self.identity})
+
+    def matches_original(self) -> bool:
+        """
+        Check that the original is still the file the operations were recorded against. The content is
+        only hashed if the modification time changed.
+        :return: True if the journal applies to the original
+        """
+        if self.identity is None or not os.path.exists(self.original):
+            return False
+        stat = os.stat(self.original)
+        if stat.st_size != self.identity["size"]:
+            return False
+        if stat.st_mtime_ns == self.identity["mtime_ns"]:
+            return True
+        return file_identity(self.original)["sha256"] == self.identity["sha256"]
+
+    def adopt(self):
+        """
+        Continue a journal of an earlier session in this process. The header is rewritten with the
+        current process, so other instances do not take the journal for abandoned.
+        :return: None
+        """
+        self.pid = os.getpid()
+        part_path = self.path + '.part'
+        with open(part_path, "w", encoding="utf-8") as fp:
+            fp.write(self._header() + "\n")
+            for entry in self.operations:
+                fp.write(json.dumps(entry, separators=(',', ':')) + "\n")
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(part_path, self.path)
+
+    def record(self, operation, **params):
+        """
+        Append an operation to the journal.
+        :param operation: name, e.g. "rotate" or "delete"
+        :param params: JSON serializable parameters
+        :return: None
+        """
+        entry = {"op": operation, **params}
+        self.operations.append(entry)
+        with open(self.path, "a", encoding="utf-8") as fp:
+            fp.write(json.dumps(entry, separators=(',', ':')) + "\n")
+            fp.flush()
+            os.fsync(fp.fileno())
+
+    def discard(self):
+        """
+        Delete the journal and the documents it refers to, e.g. after the document has been saved or closed.
+        :return: None
+        """
+        for entry in self.operations:
+            if entry["op"] == "model" and os.path.exists(entry["source"]):
+                os.remove(entry["source"])
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a journal written by an earlier session. A truncated last line from a crash is ignored.
+        :param path:
+        :return: Journal
+        """
+        with open(path, encoding="utf-8") as fp:
+            header = json.loads(fp.readline())
+            operations = []
+            for line in fp:
+                try:
+                    operations.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+        return cls(header["original"], path=path, operations=operations, pid=header.get("pid"),
+                   identity=header.get("identity"))
+
+    @classmethod
+    def pending(cls) -> list:
+        """
+        Journals left behind by sessions that did not end cleanly. Journals of running sessions are skipped.
+        :return: list of Journal
+        """
+        journals = []
+        for name in sorted(os.listdir(journal_folder())):
+            if name.endswith('.journal'):
+                try:
+                    journal = cls.load(os.path.join(journal_folder(), name))
+                except (OSError, ValueError, KeyError):
+                    continue
+                if not process_alive(journal.pid):
+                    journals.append(journal)
+        return journals
@@ -2,15 +2,21 @@
 import sys
 import os
 import math
+import multiprocessing
 from pathlib import Path
 
-from PySide6.QtWidgets import QApplication, QMainWindow, QFileDialog, QMessageBox
-from PySide6.QtPdf import QPdfDocument, QPdfDocumentRenderOptions
-from PySide6.QtCore import Slot, QPoint, Signal, Qt
+from PySide6.QtWidgets import QApplication, QMainWindow, QFileDialog, QMessageBox, QInputDialog, QLabel, QTabBar
+from PySide6.QtPdf import QPdfDocument
+from PySide6.QtCore import Slot, QPoint, Signal, Qt, QTimer
 from PySide6.QtPdfWidgets import QPdfView
-from PySide6.QtGui import QMouseEvent, QWheelEvent
+from PySide6.QtGui import QMouseEvent, QWheelEvent, QPixmap, QTransform
+from pypdf.errors import PyPdfError
 
 import pdftools
+import readercache
+from journal import Journal
+from documenttab import DocumentTab
+from adaptiverender import AdaptiveRender
 
 # Important:
 # You need to run the following command to generate the ui_form.py file
@@ -19,6 +25,10 @@ import pdftools
 from mainwindow import Ui_MainWindow
 
 ZOOM_MULTIPLIER = math.sqrt(2.0)
+# Page changes in the multi-page view are coalesced and synced at most once per frame.
+PAGE_SYNC_INTERVAL_MS = 16
+# Rotations are previewed right away and applied to the document once the user stopped rotating.
+ROTATION_RECONCILE_MS = 500
 
 
 class MainWindow(QMainWindow):
@@ -41,8 +51,9 @@ class MainWindow(QMainWindow):
         self.pdf_date = None
         self.path = None
         self.pdf_document = QPdfDocument(self)
+        self.pdf_buffer = None
+        self.document_bytes = 0
         self.zoom_mode_changed = Signal(QPdfView.ZoomMode)
-        self.render_options = QPdfDocumentRenderOptions()
         # Load UI_MainWindow class, generated from the qt designer ui file
         self.ui = Ui_MainWindow()
         self.ui.setupUi(self)
@@ -76,6 +87,17 @@ class MainWindow(QMainWindow):
         self.ui.actionMerge_Files.triggered.connect(self.action_append_file)
         self.ui.actionExtract_Page.triggered.connect(self.action_export_page)
         self.ui.actionSplit_File.triggered.connect(self.action_split_file)
+        self.ui.actionExport_Text.triggered.connect(self.action_export_text)
+        self.ui.actionExtract_Images.triggered.connect(self.action_extract_images)
+        self.ui.actionRemove_Duplicates.triggered.connect(self.action_remove_duplicates)
+        self.ui.actionRemove_Blank_Pages.triggered.connect(self.action_remove_blank_pages)
+        self.ui.actionExport_Page_Images.triggered.connect(self.action_export_page_images)
+        self.ui.actionStamp_Pages.triggered.connect(self.action_stamp_pages)
+        self.ui.actionSplit_Bookmarks.triggered.connect(self.action_split_bookmarks)
+        self.ui.actionSplit_Separator.triggered.connect(self.action_split_separator)
+        self.ui.actionExtract_Pages.triggered.connect(self.action_extract_pages)
+        self.ui.actionUndo.triggered.connect(self.action_undo)
+        self.ui.actionRedo.triggered.connect(self.action_redo)
         self.ui.actionSave_As.triggered.connect(self.action_save_file)
         self.ui.actionAbout.triggered.connect(self.action_about)
         self.ui.actionQuit_PDF_Tool.triggered.connect(self.close)
@@ -95,6 +117,38 @@ class MainWindow(QMainWindow):
         # Get current page from multi-page view and change single page view
         nav_multi = self.ui.pagesView.pageNavigator()
         nav_multi.currentPageChanged.connect(self.set_current_page)
+        self.page_sync_timer = QTimer(self)
+        self.page_sync_timer.setSingleShot(True)
+        self.page_sync_timer.setInterval(PAGE_SYNC_INTERVAL_MS)
+        self.page_sync_timer.timeout.connect(self.sync_current_page)
+        # While scrolling and zooming the single page view shows low quality previews, see AdaptiveRender
+        self.adaptive_render = AdaptiveRender(self.ui.pdfView, parent=self)
+        # Rotation preview shown on top of the single page view until the document is reloaded
+        self.pending_rotations = {}
+        self.preview_page = None
+        self.preview_image = None
+        self.rotation_preview = QLabel(self.ui.pdfView.viewport())
+        self.rotation_preview.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.rotation_preview.setAutoFillBackground(True)
+        self.rotation_preview.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.rotation_preview.hide()
+        self.rotation_timer = QTimer(self)
+        self.rotation_timer.setSingleShot(True)
+        self.rotation_timer.setInterval(ROTATION_RECONCILE_MS)
+        self.rotation_timer.timeout.connect(self.reconcile_document)
+        # Open documents as tabs, loaded documents and parsed readers share one memory budget
+        self.tabs = []
+        self.memory_budget = readercache.reader_cache.max_bytes
+        self.tab_bar = QTabBar(self)
+        self.tab_bar.setTabsClosable(True)
+        self.tab_bar.setDocumentMode(True)
+        self.tab_bar.currentChanged.connect(self.switch_tab)
+        self.tab_bar.tabCloseRequested.connect(self.close_tab)
+        self.ui.verticalLayout_2.insertWidget(0, self.tab_bar)
+        self.memory_label = QLabel(self)
+        self.statusBar().addPermanentWidget(self.memory_label)
+        # Offer recovery of a crashed session once the window is shown
+        QTimer.singleShot(0, self.recover_session)
         # self.ui.pagesView.zoomModeChanged.connect(print('zoom mode changed'))
 
     @Slot()
@@ -122,6 +176,7 @@ class MainWindow(QMainWindow):
         It can be saved if needed.
         :return: None
         """
+        self.reconcile_document()
         open_filename, ok = QFileDialog.getOpenFileName(
             self,
             "Select a PDF File",
@@ -130,24 +185,236 @@ class MainWindow(QMainWindow):
         )
         # Create copy of file in temporary folder
         if open_filename:
-            self.filename = self.pdf_tools.create_temporary_copy(open_filename)
-            # Load pdf copy from temporary folder
-            self.pdf_version = self.pdf_tools.load_pdf(self.filename)
-        if self.filename:
-            self.path = Path(self.filename)
-            self.pdf_document.load(self.filename)
-        else:
+            self.open_document(open_filename)
+        elif not self.filename:
             self.statusBar().showMessage(f'No filename specified. Try again.')
-            return
+        return
+
+    def open_document(self, open_filename, journal=None):
+        """
+        Create a working copy of the file and load it in a new tab. Edits are recorded in a new journal, or replayed from
+        the journal of an earlier session and recorded there.
+        :param open_filename:
+        :param journal: Journal to recover or None
+        :return: None
+        """
+        self.new_tab(os.path.basename(open_filename))
+        self.filename = self.pdf_tools.create_temporary_copy(open_filename)
+        # Load pdf copy from temporary folder
+        self.pdf_version = self.pdf_tools.load_pdf(self.filename)
+        self.path = Path(self.filename)
+        self.reload_document()
         self.statusBar().showMessage(f'Page {self.ui.pdfView.pageNavigator().currentPage() + 1} of '
                                      f'{self.pdf_document.pageCount()} pages.', timeout=0)
-        # Extract document information
-        self.pdf_title = self.pdf_document.metaData(QPdfDocument.MetaDataField.Title)
-        self.pdf_creator = self.pdf_document.metaData(QPdfDocument.MetaDataField.Creator)
-        self.pdf_author = self.pdf_document.metaData(QPdfDocument.MetaDataField.Author)
-        self.pdf_producer = self.pdf_document.metaData(QPdfDocument.MetaDataField.Producer)
-        self.pdf_subject = self.pdf_document.metaData(QPdfDocument.MetaDataField.Subject)
+        # Extract document information, parsed once by pypdf for both engines
+        pdf_meta = self.pdf_tools.shared_document(self.filename).info["metadata"]
+        self.pdf_title = pdf_meta.get("/Title", "")
+        self.pdf_creator = pdf_meta.get("/Creator", "")
+        self.pdf_author = pdf_meta.get("/Author", "")
+        self.pdf_producer = pdf_meta.get("/Producer", "")
+        self.pdf_subject = pdf_meta.get("/Subject", "")
+        if journal:
+            recover = self.pdf_tools.replay_journal(journal, self.filename, self.get_pdf_meta_data())
+            self.reload_document()
+            self.statusBar().showMessage(recover, timeout=5000)
+            journal.adopt()
+        self.pdf_tools.journal = journal or Journal(open_filename)
+        return
 
+    def recover_session(self):
+        """
+        Offer to recover unsaved edits from journals left behind by a crashed session.
+        :return: None
+        """
+        for journal in Journal.pending():
+            if not journal.operations or not os.path.exists(journal.original):
+                journal.discard()
+                continue
+            if not journal.matches_original():
+                # the edits were made to a different version of the file, replaying them would corrupt it
+                journal.discard()
+                self.statusBar().showMessage(f'Unsaved edits of {journal.original} can not be recovered, '
+                                             f'the file has changed since.', timeout=5000)
+                continue
+            answer = QMessageBox.question(self, "Recover Document",
+                                          f'<p>PDF-Tool did not shut down properly.</p>'
+                                          f'<p>Recover {len(journal.operations)} unsaved edits of '
+                                          f'{journal.original}?</p>')
+            if answer == QMessageBox.StandardButton.Yes:
+                open_tabs = len(self.tabs)
+                try:
+                    self.open_document(journal.original, journal)
+                except (IndexError, KeyError, ValueError, OSError, PyPdfError) as e:
+                    journal.discard()
+                    if len(self.tabs) > open_tabs:
+                        # close the tab opened for the recovery
+                        self.close_tab(self.tab_bar.currentIndex())
+                    self.statusBar().showMessage(f'Unsaved edits of {journal.original} can not be recovered. {e}',
+                                                 timeout=5000)
+                    continue
+                return
+            journal.discard()
+        return
+
+    def closeEvent(self, event):
+        """
+        Discard the journals on a regular shutdown, unsaved edits are given up deliberately.
+        :param event:
+        :return: None
+        """
+        if self.tabs:
+            self.tabs[self.tab_bar.currentIndex()].save(self)
+        for tab in self.tabs:
+            if tab.pdf_tools.journal:
+                tab.pdf_tools.journal.discard()
+        super().closeEvent(event)
+
+    def new_tab(self, title):
+        """
+        Add a tab with an empty document state and make it the active tab. The first document
+        takes over the initial state of the window.
+        :param title:
+        :return: DocumentTab
+        """
+        if self.tabs:
+            self.reconcile_document()
+            self.adaptive_render.settle()
+            self.tabs[self.tab_bar.currentIndex()].save(self)
+            self.reset_document_state()
+        tab = DocumentTab(title)
+        tab.save(self)
+        self.tabs.append(tab)
+        self.tab_bar.blockSignals(True)
+        self.tab_bar.setCurrentIndex(self.tab_bar.addTab(title))
+        self.tab_bar.blockSignals(False)
+        self.show_document()
+        return tab
+
+    def reset_document_state(self):
+        """
+        Give the window a fresh, empty document state. The temporary storage stays shared between tabs.
+        :return: None
+        """
+        self.pdf_tools = pdftools.PdfTools(temp_storage=self.pdf_tools.temp_storage)
+        self.pdf_document = QPdfDocument(self)
+        self.pdf_buffer = None
+        self.document_bytes = 0
+        self.filename = None
+        self.path = None
+        self.pdf_version = None
+        self.pdf_title = None
+        self.pdf_creator = None
+        self.pdf_author = None
+        self.pdf_producer = None
+        self.pdf_subject = None
+
+    def show_document(self):
+        """
+        Show the document of the window state in both views.
+        :return: None
+        """
+        self.ui.pdfView.setDocument(self.pdf_document)
+        self.ui.pagesView.setDocument(self.pdf_document)
+        return
+
+    @Slot(int)
+    def switch_tab(self, index):
+        """
+        Make another tab active. The state of the previous tab is kept in its DocumentTab, an evicted
+        document is loaded again from its working copy.
+        :param index:
+        :return: None
+        """
+        active = next((tab for tab in self.tabs if tab.pdf_tools is self.pdf_tools), None)
+        if active is not None:
+            self.reconcile_document()
+            self.adaptive_render.settle()
+            active.save(self)
+        if index < 0:
+            return
+        tab = self.tabs[index]
+        tab.restore(self)
+        if not tab.loaded:
+            self.pdf_tools.reader = self.pdf_tools.open_reader(self.filename)
+            self.reload_document()
+            tab.loaded = True
+        self.show_document()
+        for navigator in (self.ui.pdfView.pageNavigator(), self.ui.pagesView.pageNavigator()):
+            navigator.jump(tab.page, QPoint(), navigator.currentZoom())
+        self.enforce_memory_budget()
+        self.statusBar().showMessage(f'Page {tab.page + 1} of {self.pdf_document.pageCount()} pages.', timeout=0)
+        return
+
+    @Slot(int)
+    def close_tab(self, index):
+        """
+        Close a document. Its journal is discarded, unsaved edits are given up deliberately.
+        :param index:
+        :return: None
+        """
+        if index == self.tab_bar.currentIndex():
+            self.reconcile_document()
+            self.tabs[index].save(self)
+        tab = self.tabs.pop(index)
+        if tab.pdf_tools.journal:
+            tab.pdf_tools.journal.discard()
+        if tab.pdf_tools.temp_copy_path:
+            tab.pdf_tools.temp_storage.release(tab.pdf_tools.temp_copy_path)
+        # nothing to flush, the edits are given up
+        tab.pdf_tools.working_data = None
+        tab.pdf_tools.page_model = None
+        tab.evict()
+        if not self.tabs:
+            self.reset_document_state()
+            self.show_document()
+            self.statusBar().showMessage('No Document to show.', timeout=0)
+        # removing the tab activates a neighbour through switch_tab
+        self.tab_bar.removeTab(index)
+        tab.pdf_document.deleteLater()
+        self.update_memory_status()
+        return
+
+    def enforce_memory_budget(self):
+        """
+        Evict background tabs, least recently used first, while loaded documents and parsed readers
+        together exceed the memory budget. The active tab is never evicted.
+        :return: None
+        """
+        if not self.tabs:
+            return
+        active = self.tabs[self.tab_bar.currentIndex()]
+        active.save(self)
+        background = sorted((tab for tab in self.tabs if tab is not active and tab.loaded),
+                            key=lambda tab: tab.last_used)
+        for tab in background:
+            if self.memory_usage() <= self.memory_budget:
+                break
+            tab.evict()
+        self.update_memory_status()
+        return
+
+    def memory_usage(self) -> int:
+        """
+        Memory of all tabs, including parsed readers of other files in the shared reader cache.
+        :return: bytes
+        """
+        reader_cache = self.pdf_tools.reader_cache
+        tab_readers = sum(reader_cache.memory(tab.filename) for tab in self.tabs if tab.filename)
+        return (sum(tab.memory() for tab in self.tabs) - tab_readers
+                + reader_cache.stats()["bytes"])
+
+    def update_memory_status(self):
+        """
+        Show the memory of the active tab and of all tabs in the status bar.
+        :return: None
+        """
+        if not self.tabs:
+            self.memory_label.clear()
+            return
+        active = self.tabs[self.tab_bar.currentIndex()]
+        self.memory_label.setText(f'Tab: {active.memory() / 1024 / 1024:.1f} MB, all tabs: '
+                                  f'{self.memory_usage() / 1024 / 1024:.1f} of '
+                                  f'{self.memory_budget / 1024 / 1024:.0f} MB')
         return
 
     @Slot()
@@ -156,6 +423,7 @@ class MainWindow(QMainWindow):
         Open save dialog and save PDF document.
         :return: None
         """
+        self.reconcile_document()
         save_filename = QFileDialog.getSaveFileName(
             self,
             "Save File",
@@ -176,21 +444,117 @@ class MainWindow(QMainWindow):
         Delete page from document.
         :return: None
         """
+        self.reconcile_document()
         if self.filename:
             pdf_meta_data = self.get_pdf_meta_data()
             page_number = self.ui.pdfView.pageNavigator().currentPage()
             page_delete = self.pdf_tools.delete_page(self.filename, page_number, pdf_meta_data)
-            self.pdf_document.load(self.filename)
+            self.reload_document()
             self.ui.statusbar.showMessage(page_delete, timeout=5000)
         else:
             self.ui.statusbar.showMessage(f'No file available to delete from.', timeout=5000)
         return
 
+    @Slot()
+    def action_undo(self):
+        """
+        Revert the last page edit.
+        :return: None
+        """
+        self.reconcile_document()
+        if self.filename:
+            undo = self.pdf_tools.undo(self.filename, self.get_pdf_meta_data())
+            self.reload_document()
+            self.ui.statusbar.showMessage(undo, timeout=5000)
+        else:
+            self.ui.statusbar.showMessage(f'No file available.', timeout=5000)
+        return
+
+    @Slot()
+    def action_redo(self):
+        """
+        Apply the last reverted page edit again.
+        :return: None
+        """
+        self.reconcile_document()
+        if self.filename:
+            redo = self.pdf_tools.redo(self.filename, self.get_pdf_meta_data())
+            self.reload_document()
+            self.ui.statusbar.showMessage(redo, timeout=5000)
+        else:
+            self.ui.statusbar.showMessage(f'No file available.', timeout=5000)
+        return
+
+    @Slot()
+    def action_remove_duplicates(self):
+        """
+        Remove pages that are duplicates of an earlier page from the document.
+        :return: None
+        """
+        self.reconcile_document()
+        if self.filename:
+            pdf_meta_data = self.get_pdf_meta_data()
+            remove_duplicates = self.pdf_tools.remove_duplicate_pages(self.filename, pdf_meta_data)
+            self.reload_document()
+            self.ui.statusbar.showMessage(remove_duplicates, timeout=5000)
+        else:
+            self.ui.statusbar.showMessage(f'No file available to remove pages from.', timeout=5000)
+        return
+
+    @Slot()
+    def action_remove_blank_pages(self):
+        """
+        Detect blank pages, list them with their ink coverage and remove them after confirmation.
+        :return: None
+        """
+        self.reconcile_document()
+        if not self.filename:
+            self.ui.statusbar.showMessage(f'No file available to remove pages from.', timeout=5000)
+            return
+        try:
+            blank_pages = self.pdf_tools.find_blank_pages(self.filename)
+        except ImportError as e:
+            self.ui.statusbar.showMessage(f'{e} Install it with "pip install numpy".', timeout=5000)
+            return
+        if not blank_pages:
+            self.ui.statusbar.showMessage(f'No blank pages found.', timeout=5000)
+            return
+        candidates = ', '.join(f'{page + 1} ({coverage:.2%})' for page, coverage in blank_pages)
+        answer = QMessageBox.question(self, "Remove Blank Pages",
+                                      f'<p>Blank page candidates (ink coverage):</p><p>{candidates}</p>'
+                                      f'<p>Remove all {len(blank_pages)} pages?</p>')
+        if answer == QMessageBox.StandardButton.Yes:
+            pdf_meta_data = self.get_pdf_meta_data()
+            delete_pages = self.pdf_tools.delete_pages(self.filename, [page for page, _ in blank_pages],
+                                                       pdf_meta_data)
+            self.reload_document()
+            self.ui.statusbar.showMessage(delete_pages, timeout=5000)
+        return
+
+    @Slot()
+    def action_stamp_pages(self):
+        """
+        Stamp a text like "COPY" across all pages.
+        :return: None
+        """
+        self.reconcile_document()
+        if not self.filename:
+            self.ui.statusbar.showMessage(f'No file available to stamp.', timeout=5000)
+            return
+        stamp_text, ok = QInputDialog.getText(self, "Stamp Pages", "Stamp text:", text="COPY")
+        if ok and stamp_text:
+            pdf_meta_data = self.get_pdf_meta_data()
+            stamp = self.pdf_tools.stamp(self.filename, stamp_text, pdf_meta_data)
+            self.reload_document()
+            self.ui.statusbar.showMessage(stamp, timeout=5000)
+        return
+
     def action_export_page(self):
         """
         Export single page to separate file.
         :return: None
         """
+        self.reconcile_document()
         export_filename = QFileDialog.getSaveFileName(
             self,
             "Export Page",
@@ -206,12 +570,42 @@ class MainWindow(QMainWindow):
             self.statusBar().showMessage("No File chosen.", timeout=5000)
         return
 
+    @Slot()
+    def action_extract_pages(self):
+        """
+        Export a range of pages, e.g. "1-3, 7, 10-", into one file.
+        :return: None
+        """
+        self.reconcile_document()
+        if not self.filename:
+            self.ui.statusbar.showMessage(f'No file available to extract from.', timeout=5000)
+            return
+        current_page = self.ui.pdfView.pageNavigator().currentPage()
+        page_ranges, ok = QInputDialog.getText(self, "Extract Pages", "Pages (e.g. 1-3, 7, 10-):",
+                                               text=f'{current_page + 1}')
+        if not ok or not page_ranges:
+            return
+        export_filename = QFileDialog.getSaveFileName(
+            self,
+            "Extract Pages",
+            os.getcwd(),
+            "PDF (*.pdf)"
+        )
+        if export_filename[0]:
+            pdf_meta_data = self.get_pdf_meta_data()
+            export_file = self.pdf_tools.extract_pages(self.filename, export_filename[0], page_ranges, pdf_meta_data)
+            self.statusBar().showMessage(export_file, timeout=5000)
+        else:
+            self.statusBar().showMessage("No File chosen.", timeout=5000)
+        return
+
     @Slot()
     def action_append_file(self):
         """
         Append PDF file to currently opened file and save it to separate file.
         :return:
         """
+        self.reconcile_document()
         append_filename, ok = QFileDialog.getOpenFileName(
             self,
             "Select a PDF File",
@@ -225,9 +619,10 @@ class MainWindow(QMainWindow):
             self.pdf_version = self.pdf_tools.load_pdf(self.filename)
         if self.filename:
             self.path = Path(self.filename)
-            self.pdf_document.load(self.filename)
+            self.reload_document()
 
-            self.statusBar().showMessage(f'Append File {append_filename} successfully.', timeout=5000)
+            self.statusBar().showMessage(f'Append File {append_filename} successfully. '
+                                         f'{self.pdf_tools.temp_usage()}', timeout=5000)
         return
 
     @Slot()
@@ -236,9 +631,102 @@ class MainWindow(QMainWindow):
         Split PDF file into separate pages and save them to separate files
         :return: None
         """
+        self.reconcile_document()
+        split_folder = QFileDialog.getExistingDirectory()
+        if split_folder:
+            split_file = self.pdf_tools.split_file(split_folder, self.filename)
+            self.statusBar().showMessage(split_file, timeout=5000)
+        else:
+            self.statusBar().showMessage("No output folder chosen.", timeout=5000)
+        return
+
+    @Slot()
+    def action_export_text(self):
+        """
+        Export plain text of all pages to a text file.
+        :return: None
+        """
+        self.reconcile_document()
+        text_filename = QFileDialog.getSaveFileName(
+            self,
+            "Export Text",
+            os.getcwd(),
+            "Text (*.txt)"
+        )
+        if self.filename and text_filename[0]:
+            export_text = self.pdf_tools.export_text(self.filename, text_filename[0])
+            self.statusBar().showMessage(export_text, timeout=5000)
+        else:
+            self.statusBar().showMessage("No File chosen.", timeout=5000)
+        return
+
+    @Slot()
+    def action_extract_images(self):
+        """
+        Extract all embedded images of the document into a folder.
+        :return: None
+        """
+        self.reconcile_document()
+        image_folder = QFileDialog.getExistingDirectory()
+        if self.filename and image_folder:
+            extract_images = self.pdf_tools.extract_images(self.filename, image_folder)
+            self.statusBar().showMessage(extract_images, timeout=5000)
+        else:
+            self.statusBar().showMessage("No output folder chosen.", timeout=5000)
+        return
+
+    @Slot()
+    def action_export_page_images(self):
+        """
+        Render all pages to PNG images in a folder.
+        :return: None
+        """
+        self.reconcile_document()
+        image_folder = QFileDialog.getExistingDirectory()
+        if self.filename and image_folder:
+            export_images = self.pdf_tools.export_page_images(self.filename, image_folder)
+            self.statusBar().showMessage(export_images, timeout=5000)
+        else:
+            self.statusBar().showMessage("No output folder chosen.", timeout=5000)
+        return
+
+    @Slot()
+    def action_split_bookmarks(self):
+        """
+        Split PDF file into one file per top-level bookmark.
+        :return: None
+        """
+        self.reconcile_document()
+        split_folder = QFileDialog.getExistingDirectory()
+        if self.filename and split_folder:
+            split_file = self.pdf_tools.split_by_outline(self.filename, split_folder)
+            self.statusBar().showMessage(split_file, timeout=5000)
+        else:
+            self.statusBar().showMessage("No output folder chosen.", timeout=5000)
+        return
+
+    @Slot()
+    def action_split_separator(self):
+        """
+        Split PDF file at separator pages matched by a regular expression. The detected segments
+        are shown for confirmation before any file is written.
+        :return: None
+        """
+        self.reconcile_document()
+        if not self.filename:
+            self.statusBar().showMessage("No file available to split.", timeout=5000)
+            return
+        pattern, ok = QInputDialog.getText(self, "Split at Separator Pages", "Separator text (regular expression):")
+        if not ok or not pattern:
+            return
+        report = self.pdf_tools.split_by_separator(self.filename, None, pattern, dry_run=True)
+        answer = QMessageBox.question(self, "Split at Separator Pages",
+                                      report.replace('\n', '<br>') + '<p>Split document?</p>')
+        if answer != QMessageBox.StandardButton.Yes:
+            return
         split_folder = QFileDialog.getExistingDirectory()
         if split_folder:
-            split_file = self.pdf_tools.split_file(split_folder)
+            split_file = self.pdf_tools.split_by_separator(self.filename, split_folder, pattern)
             self.statusBar().showMessage(split_file, timeout=5000)
         else:
             self.statusBar().showMessage("No output folder chosen.", timeout=5000)
@@ -250,6 +738,7 @@ class MainWindow(QMainWindow):
         Navigate to the next available page and update the statusbar.
         :return: None
         """
+        self.reconcile_document()
         nav = self.ui.pdfView.pageNavigator()
         if nav.currentPage() + 1 >= self.pdf_document.pageCount():
             self.statusBar().showMessage(f'Page {nav.currentPage() + 1} of {self.pdf_document.pageCount()} reached. '
@@ -265,6 +754,7 @@ class MainWindow(QMainWindow):
         Navigate to the previous available page and update the statusbar.
         :return: None
         """
+        self.reconcile_document()
         nav = self.ui.pdfView.pageNavigator()
         if nav.currentPage() + 1 <= 1:
             self.statusBar().showMessage(f'Page {nav.currentPage() + 1} of {self.pdf_document.pageCount()} reached. '
@@ -277,29 +767,74 @@ class MainWindow(QMainWindow):
     @Slot()
     def action_rotate_left(self):
         """
-        Rotate page left by 90 degrees and load document again.
+        Rotate page left by 90 degrees.
         :return: None
         """
-        if self.filename:
-            page_number = self.ui.pdfView.pageNavigator().currentPage()
-            self.pdf_tools.rotate_page(self.filename, page_number, degree=270)
-            self.pdf_document.load(self.filename)
-        else:
-            self.ui.statusbar.showMessage(f'No file available to rotate.', timeout=5000)
+        self.rotate_current_page(270)
         return
 
     @Slot()
     def action_rotate_right(self):
         """
-        Rotate page right by 90 degrees and load document again.
+        Rotate page right by 90 degrees.
         :return: None
         """
-        if self.filename:
-            page_number = self.ui.pdfView.pageNavigator().currentPage()
-            self.pdf_tools.rotate_page(self.filename, page_number, degree=90)
-            self.pdf_document.load(self.filename)
-        else:
+        self.rotate_current_page(90)
+        return
+
+    def rotate_current_page(self, degree):
+        """
+        Show the rotation of the current page right away by rotating a render of the page, without touching
+        the document. Rotations are collected and applied in one pass once the user stopped rotating.
+        :param degree:
+        :return: None
+        """
+        if not self.filename:
             self.ui.statusbar.showMessage(f'No file available to rotate.', timeout=5000)
+            return
+        self.adaptive_render.settle()
+        page = self.ui.pdfView.pageNavigator().currentPage()
+        self.pending_rotations[page] = (self.pending_rotations.get(page, 0) + degree) % 360
+        viewport = self.ui.pdfView.viewport()
+        if self.preview_page != page or self.preview_image is None:
+            # the loaded document does not contain pending rotations, so this render is unrotated
+            size = self.pdf_document.pagePointSize(page).toSize()
+            self.preview_image = self.pdf_document.render(page, size.scaled(viewport.size() * 2,
+                                                                            Qt.AspectRatioMode.KeepAspectRatio))
+            self.preview_page = page
+        rotated = self.preview_image.transformed(QTransform().rotate(self.pending_rotations[page]))
+        self.rotation_preview.setGeometry(viewport.rect())
+        self.rotation_preview.setPixmap(QPixmap.fromImage(rotated).scaled(
+            viewport.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation))
+        self.rotation_preview.show()
+        self.rotation_timer.start()
+        self.ui.statusbar.showMessage(f'Page {page + 1} rotated.', timeout=5000)
+        return
+
+    @Slot()
+    def reconcile_document(self):
+        """
+        Apply pending rotations to the document and reload it, keeping the current page of both views.
+        Called after the rotation preview timeout and before any other operation on the document.
+        :return: None
+        """
+        self.rotation_timer.stop()
+        if not self.pending_rotations:
+            return
+        rotations = {page: degree for page, degree in self.pending_rotations.items() if degree}
+        self.pending_rotations = {}
+        if rotations:
+            single_page = self.ui.pdfView.pageNavigator().currentPage()
+            multi_page = self.ui.pagesView.pageNavigator().currentPage()
+            self.pdf_tools.rotate_pages(self.filename, rotations)
+            self.reload_document()
+            nav_single = self.ui.pdfView.pageNavigator()
+            nav_single.jump(single_page, QPoint(), nav_single.currentZoom())
+            nav_multi = self.ui.pagesView.pageNavigator()
+            nav_multi.jump(multi_page, QPoint(), nav_multi.currentZoom())
+        self.rotation_preview.hide()
+        self.preview_image = None
+        self.preview_page = None
         return
 
     @Slot()
@@ -309,15 +844,14 @@ class MainWindow(QMainWindow):
         :return: None
         """
         nav = self.ui.pdfView.pageNavigator()
-        self.ui.pdfView.setZoomMode(QPdfView.ZoomMode.Custom)
-        new_factor = self.ui.pdfView.zoomFactor() * ZOOM_MULTIPLIER
-        old_factor = self.ui.pdfView.zoomFactor()
+        old_factor = self.adaptive_render.target_zoom()
+        new_factor = old_factor * ZOOM_MULTIPLIER
         if new_factor > 4.1:
             self.statusBar().showMessage(f'Maximum Zoom factor {int(old_factor * 100)}% reached.', timeout=5000)
         else:
             self.statusBar().showMessage(f'Page {nav.currentPage() + 1} of {self.pdf_document.pageCount()} - '
                                          f'Zoom {int(new_factor * 100)}%', timeout=0)
-            self.ui.pdfView.setZoomFactor(new_factor)
+            self.adaptive_render.preview(self.adaptive_render.target_page(), new_factor)
         return
 
     @Slot()
@@ -327,15 +861,14 @@ class MainWindow(QMainWindow):
         :return: None
         """
         nav = self.ui.pdfView.pageNavigator()
-        self.ui.pdfView.setZoomMode(QPdfView.ZoomMode.Custom)
-        new_factor = self.ui.pdfView.zoomFactor() / ZOOM_MULTIPLIER
-        old_factor = self.ui.pdfView.zoomFactor()
+        old_factor = self.adaptive_render.target_zoom()
+        new_factor = old_factor / ZOOM_MULTIPLIER
         if new_factor < 0.125:
             self.statusBar().showMessage(f'Minimum Zoom factor {int(old_factor * 100)}% reached.', timeout=5000)
         else:
             self.statusBar().showMessage(f'Page {nav.currentPage() + 1} of {self.pdf_document.pageCount()} - '
                                          f'Zoom {int(new_factor * 100)}%', timeout=0)
-            self.ui.pdfView.setZoomFactor(new_factor)
+            self.adaptive_render.preview(self.adaptive_render.target_page(), new_factor)
         return
 
     @Slot()
@@ -345,6 +878,7 @@ class MainWindow(QMainWindow):
         :return: None
         """
         nav = self.ui.pdfView.pageNavigator()
+        self.adaptive_render.settle()
         self.ui.pdfView.setZoomFactor(1)
         # Options for ZoomMode are: Custom, FitToWidth, FitInView
         self.ui.pdfView.setZoomMode(QPdfView.ZoomMode.FitInView)
@@ -352,6 +886,23 @@ class MainWindow(QMainWindow):
                                      f'Zoom 100%', timeout=0)
         return None
 
+    def reload_document(self):
+        """
+        Load the working document into the views. The views read the bytes PdfTools parses, the edited
+        document held in memory or the working copy mapped into memory, through a device without a copy.
+        :return: None
+        """
+        document = self.pdf_tools.shared_document(self.filename)
+        pdf_buffer = document.device(self)
+        self.pdf_document.load(pdf_buffer)
+        # the document reads from the buffer, release the previous one only after loading the new one
+        if self.pdf_buffer:
+            self.pdf_buffer.deleteLater()
+        self.pdf_buffer = pdf_buffer
+        self.document_bytes = len(document.data)
+        self.enforce_memory_budget()
+        return
+
     def get_pdf_meta_data(self):
         """
         Create PDF metadata variable.
@@ -376,7 +927,8 @@ class MainWindow(QMainWindow):
                            f'<p>Document Author: {self.pdf_author}</p>'
                            f'<p>Document Creator: {self.pdf_creator}</p>'
                            f'<p>Document Producer: {self.pdf_producer}</p>'
-                           f'<p>PDF-Version: {self.pdf_version}</p>')
+                           f'<p>PDF-Version: {self.pdf_version}</p>'
+                           f'<p>{self.pdf_tools.temp_usage()}</p>')
         QMessageBox.information(self, "Document Info",
                                 messagebox_info)
         return
@@ -384,15 +936,28 @@ class MainWindow(QMainWindow):
     @Slot()
     def set_current_page(self):
         """
-        Get current page in multi page view and set single page view to current page.
+        Schedule syncing the single page view to the current page of the multi page view. During a fast
+        scroll all page changes within one frame are coalesced, so the single page view only jumps to
+        and renders the last page instead of every page scrolled past.
+        :return: page
+        """
+        if not self.page_sync_timer.isActive():
+            self.page_sync_timer.start()
+        return self.ui.pagesView.pageNavigator().currentPage()
+
+    @Slot()
+    def sync_current_page(self):
+        """
+        Get current page in multi page view and set single page view to current page. While scrolling, the
+        single page view shows a low quality preview and renders the page in full once scrolling stopped.
         :return: page
         """
+        self.reconcile_document()
         page = self.ui.pagesView.pageNavigator().currentPage()
-        nav_single = self.ui.pdfView.pageNavigator()
-        nav_single.jump(page, QPoint(), nav_single.currentZoom())
-        # print(f'current page {page}')
-        # print(f'zoom factor: {self.ui.pagesView.zoomFactor()}')
-        self.statusBar().showMessage(f'Page {nav_single.currentPage() + 1} of {self.pdf_document.pageCount()}')
+        # skip the preview if the single page view already shows the page, the view would render it again
+        if self.adaptive_render.target_page() != page:
+            self.adaptive_render.preview(page)
+        self.statusBar().showMessage(f'Page {page + 1} of {self.pdf_document.pageCount()}')
         return page
 
     @Slot()
@@ -428,6 +993,8 @@ class MainWindow(QMainWindow):
 
 
 if __name__ == "__main__":
+    # worker processes are spawned, a frozen app has to start them instead of the GUI
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     widget = MainWindow()
     widget.show()
@@ -149,6 +149,28 @@ class Ui_MainWindow(object):
         self.actionDelete_Page.setObjectName(u"actionDelete_Page")
         self.actionSplit_File = QAction(MainWindow)
         self.actionSplit_File.setObjectName(u"actionSplit_File")
+        self.actionExport_Text = QAction(MainWindow)
+        self.actionExport_Text.setObjectName(u"actionExport_Text")
+        self.actionExtract_Images = QAction(MainWindow)
+        self.actionExtract_Images.setObjectName(u"actionExtract_Images")
+        self.actionRemove_Duplicates = QAction(MainWindow)
+        self.actionRemove_Duplicates.setObjectName(u"actionRemove_Duplicates")
+        self.actionRemove_Blank_Pages = QAction(MainWindow)
+        self.actionRemove_Blank_Pages.setObjectName(u"actionRemove_Blank_Pages")
+        self.actionExport_Page_Images = QAction(MainWindow)
+        self.actionExport_Page_Images.setObjectName(u"actionExport_Page_Images")
+        self.actionStamp_Pages = QAction(MainWindow)
+        self.actionStamp_Pages.setObjectName(u"actionStamp_Pages")
+        self.actionSplit_Bookmarks = QAction(MainWindow)
+        self.actionSplit_Bookmarks.setObjectName(u"actionSplit_Bookmarks")
+        self.actionSplit_Separator = QAction(MainWindow)
+        self.actionSplit_Separator.setObjectName(u"actionSplit_Separator")
+        self.actionUndo = QAction(MainWindow)
+        self.actionUndo.setObjectName(u"actionUndo")
+        self.actionRedo = QAction(MainWindow)
+        self.actionRedo.setObjectName(u"actionRedo")
+        self.actionExtract_Pages = QAction(MainWindow)
+        self.actionExtract_Pages.setObjectName(u"actionExtract_Pages")
         self.centralwidget = QWidget(MainWindow)
         self.centralwidget.setObjectName(u"centralwidget")
         self.verticalLayout = QVBoxLayout(self.centralwidget)
@@ -227,6 +249,17 @@ class Ui_MainWindow(object):
         self.menuTools.addAction(self.actionDelete_Page)
         self.menuTools.addAction(self.actionExtract_Page)
         self.menuTools.addAction(self.actionSplit_File)
+        self.menuTools.addAction(self.actionExport_Text)
+        self.menuTools.addAction(self.actionExtract_Images)
+        self.menuTools.addAction(self.actionRemove_Duplicates)
+        self.menuTools.addAction(self.actionRemove_Blank_Pages)
+        self.menuTools.addAction(self.actionExport_Page_Images)
+        self.menuTools.addAction(self.actionStamp_Pages)
+        self.menuTools.addAction(self.actionSplit_Bookmarks)
+        self.menuTools.addAction(self.actionSplit_Separator)
+        self.menuTools.addAction(self.actionUndo)
+        self.menuTools.addAction(self.actionRedo)
+        self.menuTools.addAction(self.actionExtract_Pages)
         self.menuHelp.addAction(self.actionAbout)
         self.mainToolBar.addSeparator()
         self.mainToolBar.addAction(self.actionOpen)
@@ -334,6 +367,23 @@ class Ui_MainWindow(object):
         self.actionZoom_to_fit.setText(QCoreApplication.translate("MainWindow", u"Zoom to fit", None))
         self.actionDelete_Page.setText(QCoreApplication.translate("MainWindow", u"Delete Page", None))
         self.actionSplit_File.setText(QCoreApplication.translate("MainWindow", u"Split Document", None))
+        self.actionExport_Text.setText(QCoreApplication.translate("MainWindow", u"Export Text", None))
+        self.actionExtract_Images.setText(QCoreApplication.translate("MainWindow", u"Extract Images", None))
+        self.actionRemove_Duplicates.setText(QCoreApplication.translate("MainWindow", u"Remove Duplicate Pages", None))
+        self.actionRemove_Blank_Pages.setText(QCoreApplication.translate("MainWindow", u"Remove Blank Pages", None))
+        self.actionExport_Page_Images.setText(QCoreApplication.translate("MainWindow", u"Export Page Images", None))
+        self.actionStamp_Pages.setText(QCoreApplication.translate("MainWindow", u"Stamp Pages", None))
+        self.actionSplit_Bookmarks.setText(QCoreApplication.translate("MainWindow", u"Split by Bookmarks", None))
+        self.actionSplit_Separator.setText(QCoreApplication.translate("MainWindow", u"Split at Separator Pages", None))
+        self.actionUndo.setText(QCoreApplication.translate("MainWindow", u"Undo", None))
+#if QT_CONFIG(shortcut)
+        self.actionUndo.setShortcut(QCoreApplication.translate("MainWindow", u"Ctrl+Z", None))
+#endif // QT_CONFIG(shortcut)
+        self.actionRedo.setText(QCoreApplication.translate("MainWindow", u"Redo", None))
+        self.actionExtract_Pages.setText(QCoreApplication.translate("MainWindow", u"Extract Pages", None))
+#if QT_CONFIG(shortcut)
+        self.actionRedo.setShortcut(QCoreApplication.translate("MainWindow", u"Ctrl+Shift+Z", None))
+#endif // QT_CONFIG(shortcut)
         self.menuFile.setTitle(QCoreApplication.translate("MainWindow", u"File", None))
         self.menuView.setTitle(QCoreApplication.translate("MainWindow", u"View", None))
         self.menuTools.setTitle(QCoreApplication.translate("MainWindow", u"Tools", None))
@@ -0,0 +1,238 @@
+"""
+Content-addressed cache of operation outputs. Running the same extract, split or merge on unchanged
+inputs serves the stored files instead of doing the work again. Entries are keyed by the content hashes
+of the input files, the operation and its parameters.
+"""
+import hashlib
+import json
+import shutil
+import os
+
+from tempstorage import reflink
+
+DEFAULT_BUDGET = 1024 * 1024 * 1024
+HASH_BLOCK_SIZE = 1024 * 1024
+# Remembered content hashes kept at most, least recently used are removed first.
+MAX_HASH_MEMOS = 10000
+
+
+def cache_folder() -> str:
+    """
+    Folder of the output cache (PDFTOOL_CACHE_DIR, by default in the user's cache folder).
+    :return: path
+    """
+    return os.environ.get("PDFTOOL_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "pdftool",
+                                                                "output")
+
+
+class OutputCache:
+    """
+    Output files of operations stored below a cache folder, one folder per entry with a manifest.
+    Content hashes of input files are remembered per file identity (path, inode, modification time and
+    size), so unchanged inputs are not read again. Entries are evicted least recently used first once
+    the cache exceeds its size budget (PDFTOOL_CACHE_MB, 0 disables the cache), remembered hashes once
+    their file changed or more than MAX_HASH_MEMOS are kept.
+    Hits are served as reflinks or copies. Hard links are only used if enabled, the served files then
+    share their data with the cache and must not be written into.
+    """
+    def __init__(self, location=None, budget=None, hard_links=False):
+        self.location = location or cache_folder()
+        if budget is None:
+            budget_mb = os.environ.get("PDFTOOL_CACHE_MB")
+            budget = int(budget_mb) * 1024 * 1024 if budget_mb else DEFAULT_BUDGET
+        self.budget = budget
+        self.hard_links = hard_links
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        os.makedirs(os.path.join(self.location, "entries"), exist_ok=True)
+        os.makedirs(os.path.join(self.location, "hashes"), exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget > 0
+
+    def content_hash(self, filename) -> str:
+        """
+        SHA-256 of a file, remembered for the file's identity.
+        :param filename:
+        :return: hex digest
+        """
+        identity = self.identity(filename)
+        memo = os.path.join(self.location, "hashes", hashlib.sha1(identity.encode()).hexdigest())
+        if os.path.exists(memo):
+            with open(memo, encoding="utf-8") as fp:
+                content_hash = fp.readline().strip()
+            # the memo time marks the last use for eviction
+            os.utime(memo)
+            return content_hash
+        digest = hashlib.sha256()
+        with open(filename, "rb") as fp:
+            for block in iter(lambda: fp.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+        # the identity is stored with the hash, so memos of changed files can be found
+        with open(memo, "w", encoding="utf-8") as fp:
+            fp.write(f'{digest.hexdigest()}\n{identity}\n')
+        return digest.hexdigest()
+
+    @staticmethod
+    def identity(filename) -> str:
+        stat = os.stat(filename)
+        return f'{os.path.abspath(filename)}:{stat.st_dev}:{stat.st_ino}:{stat.st_mtime_ns}:{stat.st_size}'
+
+    def _stale_memo(self, memo) -> bool:
+        try:
+            with open(memo, encoding="utf-8") as fp:
+                fp.readline()
+                identity = fp.readline().strip()
+            return not identity or self.identity(identity.rsplit(":", 4)[0]) != identity
+        except OSError:
+            return True
+
+    def prune_hashes(self) -> int:
+        """
+        Remove remembered hashes of files that changed or no longer exist, and the least recently used
+        beyond MAX_HASH_MEMOS.
+        :return: number of removed memos
+        """
+        memos = []
+        stale = []
+        for entry in os.scandir(os.path.join(self.location, "hashes")):
+            if self._stale_memo(entry.path):
+                stale.append(entry.path)
+            else:
+                memos.append((entry.stat().st_mtime, entry.path))
+        stale += [path for _, path in sorted(memos)[:max(0, len(memos) - MAX_HASH_MEMOS)]]
+        for path in stale:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # removed concurrently by another process
+                pass
+        return len(stale)
+
+    @staticmethod
+    def key(operation, input_hashes, params) -> str:
+        """
+        Cache key of an operation.
+        :param operation: name, e.g. "extract"
+        :param input_hashes: content hashes of the inputs, in order
+        :param params: JSON serializable parameters, output paths are not part of the key
+        :return: hex digest
+        """
+        description = json.dumps({"op": operation, "inputs": input_hashes, "params": params}, sort_keys=True)
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def _entry(self, key) -> str:
+        return os.path.join(self.location, "entries", key)
+
+    def fetch(self, key, outputs):
+        """
+        Serve a cached entry to the given output paths.
+        :param key:
+        :param outputs: output paths, in the order they were stored
+        :return: manifest with the stored result on a hit, None otherwise
+        """
+        manifest_path = os.path.join(self._entry(key), "manifest.json")
+        try:
+            with open(manifest_path, encoding="utf-8") as fp:
+                manifest = json.load(fp)
+        except (OSError, ValueError):
+            manifest = None
+        if manifest is None or manifest.get("outputs") != len(outputs):
+            self.misses += 1
+            return None
+        for index, output in enumerate(outputs):
+            self._serve(os.path.join(self._entry(key), str(index)), output)
+        # the manifest time marks the last use for eviction
+        os.utime(manifest_path)
+        self.hits += 1
+        return manifest
+
+    def _serve(self, source, target):
+        if os.path.exists(target):
+            os.remove(target)
+        if reflink(source, target):
+            return
+        if self.hard_links:
+            try:
+                os.link(source, target)
+                return
+            except OSError:
+                pass
+        shutil.copyfile(source, target)
+
+    def store(self, key, outputs, result=None):
+        """
+        Store the outputs of an operation. The entry is written under a temporary name and renamed,
+        so readers never see partial entries.
+        :param key:
+        :param outputs: output paths
+        :param result: JSON serializable result, e.g. detected page numbers
+        :return: None
+        """
+        entry = self._entry(key)
+        if os.path.exists(entry):
+            return
+        part_entry = entry + '.part'
+        shutil.rmtree(part_entry, ignore_errors=True)
+        os.makedirs(part_entry)
+        for index, output in enumerate(outputs):
+            if not reflink(output, os.path.join(part_entry, str(index))):
+                shutil.copyfile(output, os.path.join(part_entry, str(index)))
+        with open(os.path.join(part_entry, "manifest.json"), "w", encoding="utf-8") as fp:
+            json.dump({"outputs": len(outputs), "result": result}, fp)
+        try:
+            os.rename(part_entry, entry)
+        except OSError:
+            # stored concurrently by another process
+            shutil.rmtree(part_entry, ignore_errors=True)
+            return
+        self.stores += 1
+        self.evict()
+
+    def _entries(self) -> list:
+        entries = []
+        for entry in os.scandir(os.path.join(self.location, "entries")):
+            manifest = os.path.join(entry.path, "manifest.json")
+            if entry.name.endswith('.part') or not os.path.exists(manifest):
+                continue
+            size = sum(item.stat().st_size for item in os.scandir(entry.path))
+            entries.append((os.stat(manifest).st_mtime, entry.path, size))
+        return entries
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache fits its budget, and stale remembered hashes.
+        :return: number of evicted entries
+        """
+        self.prune_hashes()
+        entries = sorted(self._entries())
+        used = sum(size for _, _, size in entries)
+        evicted = 0
+        for _, path, size in entries:
+            if used <= self.budget:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            used -= size
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def stats(self) -> dict:
+        """
+        Hit/miss statistics of the cache.
+        :return: dict with entries, size, budget, hits, misses, stores, evictions and hit rate
+        """
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {"entries": len(entries),
+                "bytes": sum(size for _, _, size in entries),
+                "max_bytes": self.budget,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                }
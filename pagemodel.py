@@ -0,0 +1,129 @@
+import pdfindex
+
+
+class PageModel:
+    """
+    Order and extra rotation of the pages of a document, on top of a parsed source reader. Page edits
+    only change this list, the PDF is written from it when needed. Every edit stores its inverse
+    operation on the undo stack, which costs memory per edited page instead of per document.
+
+    Operations are tuples:
+        ("rotate", {page: degree})
+        ("delete", [page, ...])
+        ("insert", [(page, (source page, rotation)), ...])
+    """
+    def __init__(self, reader):
+        self._reader = reader
+        # file holding the source document while its reader is released, see release
+        self.source_name = None
+        self.pages = [(source, 0) for source in range(len(reader.pages))]
+        self.undo_stack = []
+        self.redo_stack = []
+
+    @property
+    def reader(self):
+        if self._reader is None:
+            self._reader = pdfindex.open_reader(self.source_name)
+        return self._reader
+
+    @property
+    def parsed(self) -> bool:
+        return self._reader is not None
+
+    def release(self, source_name):
+        """
+        Drop the parsed source document, it is parsed again from a file when pages are written.
+        :param source_name: file with the bytes of the source document
+        :return: None
+        """
+        self.source_name = source_name
+        self._reader = None
+
+    def state(self) -> dict:
+        """
+        Pages and edit history as JSON serializable dict, see restore.
+        :return: dict with pages, undo and redo
+        """
+        return {"pages": self.pages, "undo": self.undo_stack, "redo": self.redo_stack}
+
+    @classmethod
+    def restore(cls, reader, state):
+        """
+        Rebuild a page model from its state, e.g. read back from a journal.
+        :param reader: parsed source document the state refers to
+        :param state: dict as returned by state, tuples may have become lists
+        :return: PageModel
+        """
+        model = cls(reader)
+        model.pages = [tuple(entry) for entry in state["pages"]]
+        model.undo_stack = [cls._operation(operation) for operation in state["undo"]]
+        model.redo_stack = [cls._operation(operation) for operation in state["redo"]]
+        return model
+
+    @staticmethod
+    def _operation(operation):
+        # JSON object keys are strings and tuples are lists
+        kind, params = operation
+        if kind == "rotate":
+            return kind, {int(page): degree for page, degree in params.items()}
+        if kind == "insert":
+            return kind, [(page, tuple(entry)) for page, entry in params]
+        return kind, list(params)
+
+    def apply(self, operation):
+        """
+        Apply an edit and make it undoable. Clears the redo stack.
+        :param operation:
+        :return: None
+        """
+        self.undo_stack.append(self._apply(operation))
+        self.redo_stack.clear()
+
+    def undo(self) -> bool:
+        """
+        Revert the last edit.
+        :return: False if there is nothing to undo
+        """
+        if not self.undo_stack:
+            return False
+        self.redo_stack.append(self._apply(self.undo_stack.pop()))
+        return True
+
+    def redo(self) -> bool:
+        """
+        Apply the last reverted edit again.
+        :return: False if there is nothing to redo
+        """
+        if not self.redo_stack:
+            return False
+        self.undo_stack.append(self._apply(self.redo_stack.pop()))
+        return True
+
+    def _apply(self, operation):
+        # applies the operation and returns its inverse
+        kind, params = operation
+        if kind == "rotate":
+            for page, degree in params.items():
+                source, rotation = self.pages[page]
+                self.pages[page] = (source, (rotation + degree) % 360)
+            return "rotate", {page: -degree for page, degree in params.items()}
+        if kind == "delete":
+            removed = [(page, self.pages.pop(page)) for page in sorted(params, reverse=True)]
+            return "insert", removed[::-1]
+        if kind == "insert":
+            for page, entry in params:
+                self.pages.insert(page, entry)
+            return "delete", [page for page, _ in params]
+        raise ValueError(f'Unknown page operation {kind}.')
+
+    def write(self, writer):
+        """
+        Add the pages in model order and rotation to a writer.
+        :param writer: PdfWriter
+        :return: writer
+        """
+        for source, rotation in self.pages:
+            page = writer.add_page(self.reader.pages[source])
+            if rotation:
+                page.rotate(rotation)
+        return writer
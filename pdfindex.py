@@ -0,0 +1,222 @@
+"""
+Persistent index of parsed PDF files. Opening a large or damaged file makes pypdf read and validate the
+whole cross-reference table, repair it if needed and walk the page tree. The index keeps the result:
+object offsets, the trailer and the page object numbers, so later opens of the same file jump straight
+to the objects. Indexes are keyed by file content, so working copies of a file share the index of the
+original, and any change of the file makes its index unused.
+"""
+from pypdf import PdfReader, PageObject
+from pypdf.generic import DictionaryObject, IndirectObject, NameObject
+from io import BytesIO
+import hashlib
+import json
+import os
+
+INDEX_VERSION = 1
+# Bytes at the start and the end of a file hashed into the index key.
+KEY_SAMPLE_BYTES = 64 * 1024
+# Maximum number of index files kept, the oldest are removed first.
+MAX_INDEXES = 256
+INHERITABLE_ATTRIBUTES = ("/Resources", "/MediaBox", "/CropBox", "/Rotate")
+# Bound for walking /Parent chains of damaged page trees.
+MAX_TREE_DEPTH = 64
+
+
+def index_folder() -> str:
+    """
+    Folder for index files (PDFTOOL_INDEX_DIR, by default in the user's cache folder).
+    :return: path
+    """
+    folder = os.environ.get("PDFTOOL_INDEX_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "pdftool",
+                                                                  "index")
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def file_key(filename) -> str:
+    """
+    Identity of a file's content: size, modification time and a hash of its first and last bytes.
+    Copies keep their modification time, so they share the key.
+    :param filename:
+    :return: key as hex string
+    """
+    stat = os.stat(filename)
+    digest = hashlib.sha1(f'{INDEX_VERSION}:{stat.st_size}:{stat.st_mtime_ns}'.encode())
+    with open(filename, "rb") as fp:
+        digest.update(fp.read(KEY_SAMPLE_BYTES))
+        if stat.st_size > KEY_SAMPLE_BYTES:
+            fp.seek(max(KEY_SAMPLE_BYTES, stat.st_size - KEY_SAMPLE_BYTES))
+            digest.update(fp.read())
+    return digest.hexdigest()
+
+
+def index_path(key) -> str:
+    return os.path.join(index_folder(), f'{key}.json')
+
+
+def load_index(key):
+    """
+    Read the index stored for a key.
+    :param key:
+    :return: index dict or None
+    """
+    try:
+        with open(index_path(key), encoding="utf-8") as fp:
+            index = json.load(fp)
+    except (OSError, ValueError):
+        return None
+    return index if index.get("version") == INDEX_VERSION and index.get("key") == key else None
+
+
+def discard_index(key):
+    if os.path.exists(index_path(key)):
+        os.remove(index_path(key))
+
+
+def build_index(reader, key) -> dict:
+    """
+    Collect the index of a fully parsed reader. Walks the page tree if that has not been done yet.
+    :param reader: PdfReader
+    :param key: file key
+    :return: index dict or None if the file can not be indexed
+    """
+    if reader.is_encrypted:
+        return None
+    pages = []
+    for page in reader.pages:
+        if page.indirect_reference is None:
+            # pages stored inline in the page tree can not be located by object number
+            return None
+        pages.append([page.indirect_reference.idnum, page.indirect_reference.generation])
+    trailer = BytesIO()
+    reader.trailer.write_to_stream(trailer)
+    return {"version": INDEX_VERSION,
+            "key": key,
+            "header": reader.pdf_header,
+            "startxref": reader._startxref,
+            "xref": [[generation, number, offset] for generation, entries in reader.xref.items()
+                     for number, offset in entries.items()],
+            "xref_free": [[generation, number, free] for generation, entries in reader.xref_free_entry.items()
+                          for number, free in entries.items()],
+            "xref_objstm": [[number, stream, position] for number, (stream, position)
+                            in reader.xref_objStm.items()],
+            "trailer": trailer.getvalue().decode("latin-1"),
+            "page_count": len(pages),
+            "pages": pages,
+            }
+
+
+def save_index(filename, reader, key=None):
+    """
+    Store the index of a parsed file. Existing indexes are kept, the oldest indexes are removed
+    once more than MAX_INDEXES exist.
+    :param filename: file the reader was loaded from
+    :param reader: PdfReader
+    :param key: file key, computed if not given
+    :return: None
+    """
+    if isinstance(reader, IndexedReader):
+        return
+    key = key or file_key(filename)
+    if os.path.exists(index_path(key)):
+        return
+    index = build_index(reader, key)
+    if index is None:
+        return
+    part_path = index_path(key) + '.part'
+    with open(part_path, "w", encoding="utf-8") as fp:
+        json.dump(index, fp, separators=(',', ':'))
+    os.replace(part_path, index_path(key))
+    entries = sorted(os.scandir(index_folder()), key=lambda entry: entry.stat().st_mtime)
+    for entry in entries[:-MAX_INDEXES]:
+        os.remove(entry.path)
+
+
+def open_reader(filename, stream=None) -> PdfReader:
+    """
+    Open a file, using its index if one exists. An index that does not match the file is discarded
+    and the file is parsed in full.
+    :param filename:
+    :param stream: content of the file, e.g. mapped into memory, read from filename if not given
+    :return: PdfReader or IndexedReader
+    """
+    key = file_key(filename)
+    index = load_index(key)
+    if index is not None:
+        try:
+            reader = IndexedReader(stream or filename, index)
+            reader.validate()
+            return reader
+        except Exception:
+            discard_index(key)
+    return PdfReader(stream or filename)
+
+
+class IndexedReader(PdfReader):
+    """
+    PdfReader restored from an index instead of parsing the cross-reference table. Pages are looked up
+    by their object number on first access, the page tree is not walked.
+    """
+    def __init__(self, stream, index):
+        self.index = index
+        self.indexed_pages = [None] * index["page_count"]
+        super().__init__(stream)
+
+    def read(self, stream):
+        index = self.index
+        self._startxref = index["startxref"]
+        self.xref = {}
+        for generation, number, offset in index["xref"]:
+            self.xref.setdefault(generation, {})[number] = offset
+        self.xref_free_entry = {}
+        for generation, number, free in index["xref_free"]:
+            self.xref_free_entry.setdefault(generation, {})[number] = free
+        self.xref_objStm = {number: (stream_number, position)
+                            for number, stream_number, position in index["xref_objstm"]}
+        self.stream = stream
+        self.trailer = DictionaryObject.read_from_stream(BytesIO(index["trailer"].encode("latin-1")), self)
+
+    def validate(self):
+        """
+        Check the index against the file: the header and the objects of the first and last page.
+        :return: None, raises on mismatch
+        """
+        if self.pdf_header != self.index["header"]:
+            raise ValueError('PDF header does not match the index.')
+        for page_number in {0, len(self.indexed_pages) - 1} if self.indexed_pages else ():
+            if self.get_page(page_number).get("/Type") != "/Page":
+                raise ValueError('Page object does not match the index.')
+
+    def get_num_pages(self) -> int:
+        if self.flattened_pages is not None:
+            return super().get_num_pages()
+        return len(self.indexed_pages)
+
+    def get_page(self, page_number):
+        if self.flattened_pages is not None:
+            return super().get_page(page_number)
+        page = self.indexed_pages[page_number]
+        if page is None:
+            number, generation = self.index["pages"][page_number]
+            page = self._page_object(IndirectObject(number, generation, self))
+            self.indexed_pages[page_number] = page
+        return page
+
+    def _page_object(self, reference):
+        # like flattening the page tree, copy attributes the page inherits from its ancestors
+        page = PageObject(self, reference)
+        node = page.get("/Parent")
+        for _ in range(MAX_TREE_DEPTH):
+            if node is None:
+                break
+            node = node.get_object()
+            for attribute in INHERITABLE_ATTRIBUTES:
+                if attribute in node and attribute not in page:
+                    page[NameObject(attribute)] = node[attribute]
+            node = node.get("/Parent")
+        return page
+
+    def _get_page_number_by_indirect(self, indirect_reference):
+        if self._page_id2num is None and self.flattened_pages is None:
+            self._page_id2num = {number: page_number for page_number, (number, _) in enumerate(self.index["pages"])}
+        return super()._get_page_number_by_indirect(indirect_reference)
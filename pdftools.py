@@ -1,15 +1,493 @@
 from pypdf import PdfReader, PdfWriter
-import tempfile
+from pypdf.generic import (IndirectObject, DictionaryObject, ArrayObject, StreamObject, NameObject, NumberObject,
+                           FloatObject, DecodedStreamObject, create_string_object)
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque, OrderedDict
+from io import BytesIO
+import hashlib
+import multiprocessing
+import zipfile
+import math
+import re
 import shutil
+import time
+import sys
 import os
 
+from tempstorage import TempStorage, reflink
+from journal import Journal
+from pagemodel import PageModel
+from outputcache import OutputCache
+from compactwriter import write_compact
+from shareddocument import SharedDocument
+import readercache
+import pdfindex
+import raster
+
+# Edited working documents up to this size are kept in memory instead of being written to disk.
+MEMORY_LIMIT = 256 * 1024 * 1024
+
+# Number of pages handed to a worker process per task when extracting text.
+TEXT_CHUNK_PAGES = 8
+
+
+def extract_text_chunk(filename, first_page, last_page) -> list:
+    """
+    Extract the text of a range of pages. Runs in worker processes, each of which keeps
+    its own parsed reader in the process-wide reader cache.
+    :param filename:
+    :param first_page:
+    :param last_page: exclusive
+    :return: list of page texts
+    """
+    reader = readercache.reader_cache.get(filename)
+    return [reader.pages[page].extract_text() for page in range(first_page, last_page)]
+
+
+def render_pool(workers) -> ProcessPoolExecutor:
+    """
+    Process pool for workers rendering with QtPdf. Workers are spawned instead of forked, a forked
+    worker inherits the QtPdf state of a process that already rendered and deadlocks on its first render.
+    :param workers: number of processes
+    :return: ProcessPoolExecutor
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+# Number of pages rendered by a worker process per task when exporting page images.
+RENDER_CHUNK_PAGES = 4
+IMAGE_FORMATS = ("PNG", "JPEG", "TIFF")
+
+STAMP_NAME = "/PdfToolStamp"
+
+# Page hashes per document, keyed by file identity and hash mode, least recently used first. Every
+# flushed edit gives the working copy a new identity, only the latest versions are kept.
+page_hash_cache = OrderedDict()
+PAGE_HASH_DOCUMENTS = 8
+# Perceptual hashes differing in at most this many of their 64 bits count as the same page.
+PERCEPTUAL_DISTANCE = 4
+# Perceptual hashes with fewer set or unset bits come from nearly uniform pages, e.g. blank pages of any
+# color all hash to 0, they are never reported as duplicates.
+MIN_HASH_BITS = 4
+
+
+def perceptual_groups(hashes, max_distance=PERCEPTUAL_DISTANCE) -> list:
+    """
+    Group pages with similar perceptual hashes. Each page joins the first earlier group whose first page
+    is within max_distance bits, so every page of a group is close to the page that is kept. Hashes are
+    split into max_distance + 1 segments, two hashes within the distance share at least one segment,
+    only pages sharing a segment are compared.
+    :param hashes: 64-bit hashes in page order
+    :param max_distance: largest Hamming distance of duplicates
+    :return: list of groups of page numbers, each with more than one page
+    """
+    segments = max_distance + 1
+    bounds = [64 * index // segments for index in range(segments + 1)]
+    buckets = {}
+    groups = {}
+    for page, page_hash in enumerate(hashes):
+        if not MIN_HASH_BITS <= page_hash.bit_count() <= 64 - MIN_HASH_BITS:
+            continue
+        keys = [(index, (page_hash >> bounds[index]) & ((1 << (bounds[index + 1] - bounds[index])) - 1))
+                for index in range(segments)]
+        candidates = sorted({first for key in keys for first in buckets.get(key, ())})
+        first = next((first for first in candidates if (hashes[first] ^ page_hash).bit_count() <= max_distance),
+                     None)
+        if first is not None:
+            groups[first].append(page)
+            continue
+        groups[page] = [page]
+        for key in keys:
+            buckets.setdefault(key, []).append(page)
+    return [pages for pages in groups.values() if len(pages) > 1]
+
+
+def hash_object(obj, digest, depth=0):
+    """
+    Feed a PDF object into a hash. Dictionaries are hashed with sorted keys, streams by their raw data,
+    so equal resources stored as different objects give the same hash.
+    :param obj: PDF object
+    :param digest: hashlib object
+    :param depth: recursion depth, resources are followed at most 8 levels deep
+    :return: None
+    """
+    obj = obj.get_object() if isinstance(obj, IndirectObject) else obj
+    if depth > 8:
+        return
+    if isinstance(obj, StreamObject):
+        digest.update(b"stream")
+        digest.update(hashlib.sha1(obj._data or b"").digest())
+    if isinstance(obj, DictionaryObject):
+        for key in sorted(obj.keys()):
+            if key not in ("/Parent", "/P"):
+                digest.update(key.encode())
+                hash_object(obj[key], digest, depth + 1)
+    elif isinstance(obj, ArrayObject):
+        digest.update(b"[")
+        for item in obj:
+            hash_object(item, digest, depth + 1)
+        digest.update(b"]")
+    elif not isinstance(obj, StreamObject):
+        digest.update(repr(obj).encode())
+
+
+def page_content_hash(page) -> str:
+    """
+    Hash of a page's content stream with normalized whitespace, its resources and its visible geometry.
+    :param page: PageObject
+    :return: hex digest
+    """
+    digest = hashlib.sha1()
+    contents = page.get_contents()
+    if contents is not None:
+        digest.update(b" ".join(contents.get_data().split()))
+    hash_object(page.get("/Resources"), digest)
+    digest.update(repr((list(page.mediabox), page.rotation)).encode())
+    return digest.hexdigest()
+
+
+def stream_object(data, entries=None) -> DecodedStreamObject:
+    """
+    Create a stream object with the given content and dictionary entries.
+    :param data: bytes
+    :param entries: dict of stream dictionary entries
+    :return: DecodedStreamObject
+    """
+    stream = DecodedStreamObject()
+    stream.set_data(data)
+    for key, value in (entries or {}).items():
+        stream[NameObject(key)] = value
+    return stream
+
+
+def stamp_name(xobjects, stamp_ref) -> str:
+    """
+    Resource name for a stamp on a page, one not used by the page yet, so earlier stamps stay.
+    :param xobjects: /XObject resource dictionary of the page
+    :param stamp_ref: reference of the stamp, its name is reused on resources shared between pages
+    :return: name
+    """
+    name, number = STAMP_NAME, 0
+    while name in xobjects and xobjects.raw_get(name) != stamp_ref:
+        number += 1
+        name = f'{STAMP_NAME}{number}'
+    return name
+
+
+def build_stamp(text, font_size, opacity) -> DecodedStreamObject:
+    """
+    Build a Form XObject drawing the stamp text in red Helvetica, centered on its origin.
+    :param text:
+    :param font_size:
+    :param opacity: fill opacity between 0 and 1
+    :return: form XObject stream
+    """
+    # capital Helvetica glyphs are about 0.7 em wide on average, good enough for centering
+    width = 0.7 * font_size * len(text)
+    escaped = text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)').encode('latin-1', 'replace')
+    content = (b'q /GS0 gs 0.8 0 0 rg BT /F0 %d Tf %.2f %.2f Td (' % (font_size, -width / 2, -font_size / 3)
+               + escaped + b') Tj ET Q')
+    font = DictionaryObject({NameObject("/Type"): NameObject("/Font"),
+                             NameObject("/Subtype"): NameObject("/Type1"),
+                             NameObject("/BaseFont"): NameObject("/Helvetica"),
+                             NameObject("/Encoding"): NameObject("/WinAnsiEncoding")})
+    graphics_state = DictionaryObject({NameObject("/Type"): NameObject("/ExtGState"),
+                                       NameObject("/ca"): FloatObject(opacity)})
+    resources = DictionaryObject({NameObject("/Font"): DictionaryObject({NameObject("/F0"): font}),
+                                  NameObject("/ExtGState"): DictionaryObject({NameObject("/GS0"): graphics_state})})
+    # padded, so a misestimated text width does not clip the stamp
+    bbox = ArrayObject([FloatObject(-width / 2 - font_size), FloatObject(-font_size),
+                        FloatObject(width / 2 + font_size), FloatObject(font_size)])
+    return stream_object(content, {"/Type": NameObject("/XObject"), "/Subtype": NameObject("/Form"),
+                                   "/FormType": NumberObject(1), "/BBox": bbox, "/Resources": resources})
+
+
+def apply_stamp(writer, text, pages=None, font_size=72, opacity=0.3) -> list:
+    """
+    Stamp text diagonally across pages of a writer, see PdfTools.stamp.
+    :param writer: PdfWriter
+    :param text:
+    :param pages: page numbers, defaults to all pages
+    :param font_size:
+    :param opacity:
+    :return: list of stamped page numbers
+    """
+    stamp_ref = writer._add_object(build_stamp(text, font_size, opacity))
+    # saves the graphics state before the existing page content
+    save_ref = writer._add_object(stream_object(b'q'))
+    # draws the stamp at a page center, shared between pages of the same size and stamp name
+    draw_refs = {}
+    rotation = math.radians(45)
+    targets = range(len(writer.pages)) if pages is None else pages
+    for page_number in targets:
+        page = writer.pages[page_number]
+        box = page.mediabox
+        center = (round(float(box.left + box.right) / 2, 2), round(float(box.bottom + box.top) / 2, 2))
+        if "/Resources" not in page:
+            page[NameObject("/Resources")] = DictionaryObject()
+        resources = page["/Resources"].get_object()
+        if "/XObject" not in resources:
+            resources[NameObject("/XObject")] = DictionaryObject()
+        xobjects = resources["/XObject"].get_object()
+        name = stamp_name(xobjects, stamp_ref)
+        xobjects[NameObject(name)] = stamp_ref
+        if (center, name) not in draw_refs:
+            draw_refs[center, name] = writer._add_object(stream_object(
+                b'Q q %.4f %.4f %.4f %.4f %.2f %.2f cm %s Do Q' % (
+                    math.cos(rotation), math.sin(rotation), -math.sin(rotation), math.cos(rotation),
+                    center[0], center[1], name.encode())))
+        contents = page.get("/Contents")
+        contents = contents.get_object() if contents is not None else ArrayObject()
+        if isinstance(contents, ArrayObject):
+            contents = list(contents)
+        else:
+            contents = [page.raw_get("/Contents")]
+        page[NameObject("/Contents")] = ArrayObject([save_ref, *contents, draw_refs[center, name]])
+    return list(targets)
+
+
+def apply_operation(model, entry) -> PageModel:
+    """
+    Apply a journaled operation to a page model, used to replay a journal in memory. Page edits and
+    undo/redo only change the model, content edits write the model and continue on the result.
+    :param model: PageModel
+    :param entry: operation as recorded by Journal.record
+    :return: PageModel to continue with
+    """
+    operation = entry["op"]
+    if operation == "rotate":
+        # JSON object keys are strings
+        model.apply(("rotate", {int(page): degree for page, degree in entry["pages"].items()}))
+    elif operation == "delete":
+        model.apply(("delete", entry["pages"]))
+    elif operation == "undo":
+        model.undo()
+    elif operation == "redo":
+        model.redo()
+    elif operation == "model":
+        # page model carried over a save, with its source document next to the journal
+        model = PageModel.restore(pdfindex.open_reader(entry["source"]), entry)
+    elif operation in ("stamp", "append"):
+        writer = model.write(PdfWriter())
+        if operation == "stamp":
+            apply_stamp(writer, entry["text"], entry["pages"], entry["font_size"], entry["opacity"])
+        elif os.path.exists(entry["file"]):
+            writer.append(readercache.reader_cache.get(entry["file"]))
+        buffer = BytesIO()
+        writer.write(buffer)
+        model = PageModel(PdfReader(buffer))
+    return model
+
+
+def info_update(reader, file_size, pdf_meta):
+    """
+    Build an incremental update that replaces the document information dictionary. The update is
+    appended to the unchanged file: a new Info object, a cross-reference section for it and a trailer
+    pointing back to the previous one. Files using cross-reference streams get a cross-reference stream.
+    Fields not in pdf_meta are kept.
+    :param reader: PdfReader of the file
+    :param file_size: size of the file in bytes
+    :param pdf_meta:
+    :return: bytes to append, b'' if the information is unchanged, None if the file can not be updated
+    """
+    if reader.is_encrypted:
+        return None
+    info = reader.trailer.get("/Info")
+    current = info.get_object() if info is not None else None
+    current = current if isinstance(current, DictionaryObject) else DictionaryObject()
+    if all(key in current and str(current[key]) == str(value) for key, value in pdf_meta.items()):
+        return b''
+    reader.stream.seek(reader._startxref)
+    head = reader.stream.read(32)
+    if head.startswith(b'xref'):
+        xref_stream = False
+    elif re.match(rb'\d+\s+\d+\s+obj', head):
+        xref_stream = True
+    else:
+        # the startxref pointer is broken, the file has to be rewritten
+        return None
+    updated = DictionaryObject(current)
+    for key, value in pdf_meta.items():
+        updated[NameObject(key)] = create_string_object(str(value))
+    size = int(reader.trailer["/Size"])
+    trailer = DictionaryObject({NameObject("/Size"): NumberObject(size + 2 if xref_stream else size + 1),
+                                NameObject("/Root"): reader.trailer.raw_get("/Root"),
+                                NameObject("/Info"): IndirectObject(size, 0, reader),
+                                NameObject("/Prev"): NumberObject(reader._startxref)})
+    if "/ID" in reader.trailer:
+        trailer[NameObject("/ID")] = reader.trailer.raw_get("/ID")
+    update = BytesIO()
+    update.write(b'\n')
+    info_offset = file_size + update.tell()
+    update.write(f'{size} 0 obj\n'.encode())
+    updated.write_to_stream(update)
+    update.write(b'\nendobj\n')
+    xref_offset = file_size + update.tell()
+    if xref_stream:
+        width = max(4, (xref_offset.bit_length() + 7) // 8)
+        data = b''.join(b'\x01' + offset.to_bytes(width, "big") + b'\x00\x00' for offset in (info_offset, xref_offset))
+        trailer.update({NameObject("/Type"): NameObject("/XRef"),
+                        NameObject("/W"): ArrayObject([NumberObject(1), NumberObject(width), NumberObject(2)]),
+                        NameObject("/Index"): ArrayObject([NumberObject(size), NumberObject(2)]),
+                        NameObject("/Length"): NumberObject(len(data))})
+        update.write(f'{size + 1} 0 obj\n'.encode())
+        trailer.write_to_stream(update)
+        update.write(b'\nstream\n' + data + b'\nendstream\nendobj\n')
+    else:
+        # starting with the free head entry keeps readers from guessing a shifted table
+        update.write(f'xref\n0 1\n0000000000 65535 f \n{size} 1\n{info_offset:010d} 00000 n \ntrailer\n'.encode())
+        trailer.write_to_stream(update)
+        update.write(b'\n')
+    update.write(f'startxref\n{xref_offset}\n%%EOF\n'.encode())
+    return update.getvalue()
+
+
+def write_page_range(filename, export_name, first_page, last_page, outline=None, pdf_meta=None,
+                     objects_per_stream=0) -> str:
+    """
+    Write a range of pages to a new file. Runs in worker processes when splitting in parallel.
+    :param filename:
+    :param export_name:
+    :param first_page:
+    :param last_page: exclusive
+    :param outline: nested list of (title, page, children) with page numbers relative to first_page
+    :param pdf_meta:
+    :param objects_per_stream: pack objects into object streams of this size, 0 for a classic file
+    :return: export name
+    """
+    reader = readercache.reader_cache.get(filename)
+    writer = PdfWriter()
+    for page in range(first_page, last_page):
+        writer.add_page(reader.pages[page])
+    add_outline(writer, outline or [])
+    if pdf_meta:
+        writer.add_metadata(pdf_meta)
+    with open(export_name, "wb") as fp:
+        if objects_per_stream:
+            write_compact(writer, fp, objects_per_stream)
+        else:
+            writer.write(fp)
+    return export_name
+
+
+def parse_page_ranges(expression, number_of_pages) -> list:
+    """
+    Parse a page range expression like "1-3, 7, 10-" with 1-based page numbers. Open ranges run to the
+    first or last page, pages are returned in the given order, repeated pages only once.
+    :param expression:
+    :param number_of_pages:
+    :return: list of 0-based page numbers
+    """
+    pages = []
+    for part in expression.replace(';', ',').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        match = re.fullmatch(r'(\d*)\s*-\s*(\d*)|(\d+)', part)
+        if not match:
+            raise ValueError(f'Invalid page range "{part}".')
+        if match.group(3):
+            first = last = int(match.group(3))
+        else:
+            first = int(match.group(1) or 1)
+            last = int(match.group(2) or number_of_pages)
+        if not 1 <= first <= last <= number_of_pages:
+            raise ValueError(f'Page range "{part}" outside of pages 1-{number_of_pages}.')
+        pages.extend(range(first - 1, last))
+    return list(dict.fromkeys(pages))
+
+
+def add_outline(writer, outline, parent=None):
+    for title, page, children in outline:
+        item = writer.add_outline_item(title, page, parent)
+        add_outline(writer, children, item)
+
+
+def outline_tree(reader, outline, offset=0) -> list:
+    """
+    Convert a pypdf outline into a nested list of (title, page, children), page numbers shifted by offset.
+    Items without a destination page are skipped.
+    :param reader:
+    :param outline: reader.outline or one of its nested lists
+    :param offset: subtracted from each page number
+    :return: nested list
+    """
+    tree = []
+    for item in outline:
+        if isinstance(item, list):
+            if tree:
+                tree[-1][2].extend(outline_tree(reader, item, offset))
+            continue
+        page = reader.get_destination_page_number(item)
+        if page is not None and page >= 0:
+            tree.append((str(item.title), page - offset, []))
+    return tree
+
+
+def safe_filename(title) -> str:
+    return re.sub(r'[^\w\- ]+', '_', title).strip()[:80] or 'Untitled'
+
+
+# Image filters written out byte for byte, the stream data already is a complete image file.
+PASSTHROUGH_FILTERS = {"/DCTDecode": ".jpg", "/JPXDecode": ".jp2"}
+
+
+def find_image_references(resources, path=()):
+    """
+    Find image XObjects in page resources, including images nested in form XObjects.
+    :param resources: resource dictionary
+    :param path: names of the enclosing form XObjects
+    :return: generator of (name path, reference or object)
+    """
+    x_objects = resources.get("/XObject") if resources else None
+    if not x_objects:
+        return
+    for name, ref in x_objects.get_object().items():
+        obj = ref.get_object()
+        if obj.get("/Subtype") == "/Image":
+            yield path + (name,), ref
+        elif obj.get("/Subtype") == "/Form" and len(path) < 8:
+            yield from find_image_references(obj.get("/Resources"), path + (name,))
+
+
+def extract_image(filename, page, path, export_base) -> str:
+    """
+    Write a single embedded image to file. DCT and JPX streams are written byte for byte,
+    images using other filters are decoded by pypdf (requires Pillow).
+    :param filename:
+    :param page: page number
+    :param path: names of the image and its enclosing form XObjects
+    :param export_base: file name without extension
+    :return: written file name
+    """
+    reader = readercache.reader_cache.get(filename)
+    resources = reader.pages[page].get("/Resources")
+    for name in path[:-1]:
+        resources = resources["/XObject"][name].get_object().get("/Resources")
+    image = resources["/XObject"][path[-1]].get_object()
+    filters = image.get("/Filter")
+    if isinstance(filters, list) and len(filters) == 1:
+        filters = filters[0]
+    if filters in PASSTHROUGH_FILTERS:
+        export_name = export_base + PASSTHROUGH_FILTERS[filters]
+        # raw, still encoded stream data
+        data = image._data
+    else:
+        image_file = reader.pages[page].images[path[0] if len(path) == 1 else path]
+        export_name = export_base + os.path.splitext(image_file.name)[1]
+        data = image_file.data
+    with open(export_name, "wb") as fp:
+        fp.write(data)
+    return export_name
+
 
 class PdfTools:
     """
     Class to handle pdf files and operations. Relies on pypdf for PDF manipulation.
     """
-    def __init__(self):
+    def __init__(self, reader_cache=None, temp_storage=None):
         super().__init__()
+        self.reader_cache = reader_cache or readercache.reader_cache
         self.pdf_version = None
         self.obj = None
         self.annotation = None
@@ -18,10 +496,30 @@ class PdfTools:
         self.temp_dir = None
         self.temp = None
         self.number_of_pages = None
-        self.reader = None
+        self._reader = None
+        # file whose reader is parsed on first use, set after edits
+        self.pending_reader = None
         self.current_folder = os.getcwd()
         self.writer = None
-        self.temp_folder = tempfile.TemporaryDirectory()
+        self.text_export_stats = None
+        self.memory_limit = MEMORY_LIMIT
+        self.working_name = None
+        self.working_data = None
+        # working document shared with the viewer, see shared_document
+        self.document = None
+        self.journal = None
+        self.page_model = None
+        self.page_model_name = None
+        # identity of the file the page model was last written to, see current_model
+        self.page_model_key = None
+        # copy of the page model's source document in temporary storage, see release_model
+        self.model_source = None
+        # documents opened side by side share one temporary storage
+        self.temp_storage = temp_storage or TempStorage()
+        self.output_cache = OutputCache()
+        # objects per object stream in written files by operation ("edit", "save", "merge", "extract",
+        # "extract_pages", "split", "split_range"), "default" for operations not listed, 0 for classic files
+        self.object_streams = {}
 
     # @staticmethod
     def append_file(self, filename1, filename2):
@@ -31,18 +529,73 @@ class PdfTools:
         :param filename2:
         :return: saved filename
         """
-        input1 = PdfReader(filename1)
-        input2 = PdfReader(filename2)
-        merger = PdfWriter()
-        merger.append(input1)
-        merger.append(input2)
         # write merged file to temp folder and load again
-        save_filename = os.path.join(self.temp_folder.name, 'temp_merged.pdf')
-        
-        with open(save_filename, "wb") as fp:
-            merger.write(fp)
+        save_filename = self.temp_storage.new_file('temp_merged')
+
+        def merge():
+            merger = PdfWriter()
+            merger.append(self.open_reader(filename1))
+            merger.append(self.open_reader(filename2))
+            self.write_pdf(merger, save_filename, "merge")
+        self.cached_outputs("merge", [filename1, filename2], {}, [save_filename], merge)
+        if self.journal:
+            self.journal.record("append", file=os.path.abspath(filename2))
+        # only needed until it has been copied to a working copy
+        self.temp_storage.release(save_filename)
         return save_filename
 
+    def input_hash(self, filename) -> str:
+        """
+        Content hash of an input file, the in-memory working document is hashed directly, once per version.
+        :param filename:
+        :return: hex digest
+        """
+        if self.working_data is not None and filename == self.working_name:
+            return self.shared_document(filename).content_hash
+        return self.output_cache.content_hash(filename)
+
+    def cached_outputs(self, operation, inputs, params, outputs, produce) -> bool:
+        """
+        Run an operation through the output cache. If the same operation ran on inputs with the same
+        content before, the stored outputs are served, otherwise the outputs are produced and stored.
+        :param operation: name, e.g. "extract"
+        :param inputs: input files
+        :param params: JSON serializable parameters without output paths
+        :param outputs: output paths
+        :param produce: function writing the outputs
+        :return: True if served from the cache
+        """
+        if not self.output_cache.enabled:
+            produce()
+            return False
+        if self.objects_per_stream(operation):
+            params = {"params": params, "object_streams": self.objects_per_stream(operation)}
+        key = self.output_cache.key(operation, [self.input_hash(filename) for filename in inputs], params)
+        if self.output_cache.fetch(key, outputs) is not None:
+            return True
+        produce()
+        self.output_cache.store(key, outputs)
+        return False
+
+    def cached_result(self, operation, inputs, params, compute):
+        """
+        Like cached_outputs for operations computing a JSON serializable result instead of files.
+        :param operation:
+        :param inputs: input files
+        :param params: JSON serializable parameters
+        :param compute: function returning the result
+        :return: result
+        """
+        if not self.output_cache.enabled:
+            return compute()
+        key = self.output_cache.key(operation, [self.input_hash(filename) for filename in inputs], params)
+        manifest = self.output_cache.fetch(key, [])
+        if manifest is not None:
+            return manifest["result"]
+        result = compute()
+        self.output_cache.store(key, [], result)
+        return result
+
     def create_temporary_copy(self, path):
         """
         Create a temporary copy of the document for manipulation.
@@ -50,27 +603,189 @@ class PdfTools:
         :return: str: temporary copy path
         """
         if self.temp_copy_path:
-            self.temp_copy_path = os.path.join(self.temp_folder.name, 'temp_file2.pdf')
-        else:
-            self.temp_copy_path = os.path.join(self.temp_folder.name, 'temp_file1.pdf')
-        shutil.copy2(path, self.temp_copy_path)
+            self.temp_storage.release(self.temp_copy_path)
+        self.temp_copy_path = self.temp_storage.copy_in(path)
+        self.working_data = None
+        self.document = None
+        self.page_model = None
+        if self.model_source:
+            self.temp_storage.release(self.model_source)
+            self.model_source = None
         return self.temp_copy_path
 
+    @property
+    def reader(self) -> PdfReader:
+        """
+        Parsed reader of the loaded document. After page edits the new document is only parsed when
+        a reader is needed, not on every edit.
+        :return: PdfReader or None
+        """
+        if self._reader is None and self.pending_reader:
+            self._reader = self.open_reader(self.pending_reader)
+            self.pending_reader = None
+        return self._reader
+
+    @reader.setter
+    def reader(self, reader):
+        self._reader = reader
+        self.pending_reader = None
+
+    def open_reader(self, filename) -> PdfReader:
+        """
+        Return a parsed reader for the file, served from the reader cache when the file is unchanged.
+        The working document is parsed from the bytes it shares with the viewer.
+        :param filename:
+        :return: PdfReader
+        """
+        document = self.shared_document(filename)
+        if document is not None:
+            return document.reader
+        return self.reader_cache.get(filename)
+
+    def shared_document(self, filename):
+        """
+        The working document as SharedDocument: the in-memory document, or the working copy on disk mapped
+        into memory. Other files are not mapped, other programs may write into them.
+        :param filename:
+        :return: SharedDocument or None if filename is not the working document
+        """
+        if self.working_data is not None and filename == self.working_name:
+            if self.document is None or self.document.data is not self.working_data:
+                self.document = SharedDocument(self.working_data)
+            return self.document
+        if not filename or filename != self.temp_copy_path or not os.path.exists(filename):
+            return None
+        if self.document is None or not self.document.current(filename):
+            self.document = SharedDocument.open(filename)
+        return self.document
+
+    def objects_per_stream(self, operation) -> int:
+        """
+        Object stream size configured for the output of an operation.
+        :param operation: name, e.g. "extract"
+        :return: objects per object stream, 0 for classic files
+        """
+        return self.object_streams.get(operation, self.object_streams.get("default", 0))
+
+    def write_stream(self, writer, stream, operation=None):
+        """
+        Write a document as classic file or with object streams, depending on the operation.
+        :param writer: PdfWriter
+        :param stream: binary file object
+        :param operation: name, see object_streams
+        :return: None
+        """
+        objects_per_stream = self.objects_per_stream(operation)
+        if objects_per_stream:
+            write_compact(writer, stream, objects_per_stream)
+        else:
+            writer.write(stream)
+
+    def write_pdf(self, writer, filename, operation=None):
+        """
+        Write document to file and drop stale cached readers of that file. The file is written next to
+        the target and then replaced, working copies may be hard links.
+        :param writer: PdfWriter
+        :param filename:
+        :param operation: name, see object_streams
+        :return: None
+        """
+        part_filename = filename + '.part'
+        with open(part_filename, "wb") as fp:
+            self.write_stream(writer, fp, operation)
+        os.replace(part_filename, filename)
+        self.reader_cache.invalidate(filename)
+
+    def commit_pdf(self, writer, filename):
+        """
+        Store an edited working document. Documents up to memory_limit are kept in memory, so previews
+        can be loaded from the buffer without a disk round trip. Larger documents are written to disk.
+        :param writer: PdfWriter
+        :param filename: working copy the document stands for
+        :return: None
+        """
+        if self.working_data is not None and filename == self.working_name:
+            estimated_size = len(self.working_data)
+        else:
+            estimated_size = os.path.getsize(filename) if os.path.exists(filename) else 0
+        if estimated_size > self.memory_limit:
+            self.working_data = None
+            self.write_pdf(writer, filename, "edit")
+            return
+        buffer = BytesIO()
+        self.write_stream(writer, buffer, "edit")
+        self.working_name = filename
+        self.working_data = buffer.getvalue()
+        # parsed on first use, the preview is loaded from working_data directly
+        self.document = None
+
+    def flush_working(self, filename):
+        """
+        Write the in-memory working document to disk. Needed before operations that read the file
+        from disk, e.g. in worker processes.
+        :param filename:
+        :return: None
+        """
+        if self.working_data is not None and filename == self.working_name:
+            with open(filename + '.part', "wb") as fp:
+                fp.write(self.working_data)
+            os.replace(filename + '.part', filename)
+            self.reader_cache.invalidate(filename)
+            self.working_data = None
+            self.document = None
+            if filename == self.page_model_name:
+                self.page_model_key = self.file_key(filename)
+
     def load_pdf(self, filename):
         """
         Load PDF document in pypdf reader for later manipulation.
         :param filename:
         :return:
         """
-        if self.reader:
-            del self.reader
-        self.reader = PdfReader(filename)
+        # the previous reader stays in place if the file can not be opened
+        self.reader = self.open_reader(filename)
         self.number_of_pages = len(self.reader.pages)
         self.pdf_version = self.reader.pdf_header.replace('%PDF-', '')
         for page in self.reader.pages:
             self.get_annotations(page)
+        if self.working_data is None or filename != self.working_name:
+            # all pages have been parsed, keep the result for the next time the file is opened
+            pdfindex.save_index(filename, self.reader)
         return self.pdf_version
 
+    def temp_usage(self) -> str:
+        """
+        Report disk space used by temporary working files.
+        :return: Message with used space and budget.
+        """
+        return (f'Temporary files: {self.temp_storage.usage() / 1024 / 1024:.1f} MB of '
+                f'{self.temp_storage.budget / 1024 / 1024:.0f} MB')
+
+    def memory_usage(self) -> int:
+        """
+        Estimate the memory held for the working document: the in-memory document, its parsed reader,
+        cached readers of the working copy and a re-parsed page model source. A mapped working copy is paged in from disk, only
+        its parsed objects are counted.
+        :return: bytes
+        """
+        usage = 0
+        parsed = self.document is not None and self.document.parsed
+        if self.working_data is not None:
+            factor = readercache.READER_OVERHEAD if parsed else 1
+            usage += len(self.working_data) * factor
+        elif self.document is not None and not self.document.mapped:
+            # working copy read into memory, e.g. on Windows
+            factor = readercache.READER_OVERHEAD if parsed else 1
+            usage += len(self.document.data) * factor
+        elif parsed:
+            usage += len(self.document.data) * (readercache.READER_OVERHEAD - 1)
+        if self.temp_copy_path:
+            usage += self.reader_cache.memory(self.temp_copy_path)
+        if self.page_model is not None and self.page_model.parsed and self.page_model.source_name:
+            # source of the page model parsed again after release_model
+            usage += os.path.getsize(self.page_model.source_name) * readercache.READER_OVERHEAD
+        return usage
+
     def get_annotations(self, page):
         if "/Annots" in page:
             for annot in page["/Annots"]:
@@ -78,25 +793,134 @@ class PdfTools:
                 self.annotation = {"subtype": self.obj["/Subtype"], "location": self.obj["/Rect"]}
             return self.obj
 
+    def edit_pages(self, filename, operation, pdf_meta=None):
+        """
+        Apply a page edit to the page model of the working document and commit the result. The model is
+        created from the parsed document on first use and kept until the page content changes, so edits
+        neither reparse the document nor keep copies of it for undo.
+        :param filename:
+        :param operation: see PageModel
+        :param pdf_meta:
+        :return: None
+        """
+        if self.current_model(filename) is None:
+            self.page_model = PageModel(self.open_reader(filename))
+            self.page_model_name = filename
+        self.page_model.apply(operation)
+        self.commit_model(filename, pdf_meta)
+        if filename != self.temp_copy_path:
+            # files edited in place, e.g. by the HTTP service, may be replaced by others, keep no history
+            self.page_model = None
+
+    @staticmethod
+    def file_key(filename):
+        return readercache.ReaderCache.file_key(filename) if os.path.exists(filename) else None
+
+    def current_model(self, filename):
+        """
+        The page model of a file, if the file has not been changed by anyone else since the model
+        was last written to it.
+        :param filename:
+        :return: PageModel or None
+        """
+        if self.page_model is None or self.page_model_name != filename:
+            return None
+        if self.page_model_key != self.file_key(filename):
+            self.page_model = None
+            return None
+        return self.page_model
+
+    def release_model(self):
+        """
+        Drop the parsed source document of the page model, e.g. when its tab is evicted. The source is
+        copied to temporary storage once and parsed again on the next edit, undo or redo.
+        :return: None
+        """
+        model = self.page_model
+        if model is None or not model.parsed:
+            return
+        if model.source_name is None:
+            if self.model_source:
+                self.temp_storage.release(self.model_source)
+            self.model_source = self.temp_storage.new_file("model_source")
+            self.write_model_source(model, self.model_source)
+        model.release(self.model_source)
+
+    @staticmethod
+    def write_model_source(model, path):
+        """
+        Write the source document of a page model to a file.
+        :param model: PageModel
+        :param path:
+        :return: None
+        """
+        if model.source_name is not None:
+            shutil.copyfile(model.source_name, path)
+            return
+        # the working copy on disk has been replaced since, the source only lives in the reader's stream
+        stream = model.reader.stream
+        stream.seek(0)
+        with open(path, "wb") as fp:
+            shutil.copyfileobj(stream, fp)
+
+    def commit_model(self, filename, pdf_meta=None):
+        """
+        Write the page model to the working document.
+        :param filename:
+        :param pdf_meta:
+        :return: None
+        """
+        self.writer = self.page_model.write(PdfWriter())
+        if pdf_meta:
+            self.writer.add_metadata(pdf_meta)
+        self.commit_pdf(self.writer, filename)
+        self.page_model_key = self.file_key(filename)
+        self.reader = None
+        self.pending_reader = filename
+        self.number_of_pages = len(self.page_model.pages)
+
+    def undo(self, filename, pdf_meta=None) -> str:
+        """
+        Revert the last page edit (rotate or delete). Edits of the page content, e.g. stamps,
+        start a new history.
+        :param filename:
+        :param pdf_meta:
+        :return: Info about operation.
+        """
+        if self.current_model(filename) is None or not self.page_model.undo():
+            return f'Nothing to undo.'
+        self.commit_model(filename, pdf_meta)
+        if self.journal:
+            self.journal.record("undo")
+        return f'Undo successful.'
+
+    def redo(self, filename, pdf_meta=None) -> str:
+        """
+        Apply the last reverted page edit again.
+        :param filename:
+        :param pdf_meta:
+        :return: Info about operation.
+        """
+        if self.current_model(filename) is None or not self.page_model.redo():
+            return f'Nothing to redo.'
+        self.commit_model(filename, pdf_meta)
+        if self.journal:
+            self.journal.record("redo")
+        return f'Redo successful.'
+
     def delete_page(self, filename, skip_page, pdf_meta) -> str:
         """
-        Delete page from document. PdfWriter.pages emulates a list of PageObject. To remove a page or pages
-        you remove a page from the list (through the del operator).
+        Delete page from document.
         :param filename:
         :param skip_page:
         :param pdf_meta:
         :return: Info about operation.
         """
-        self.writer = PdfWriter()
-        self.writer.append_pages_from_reader(self.reader)
-        self.writer.add_metadata(pdf_meta)
-        if skip_page >= 0 or skip_page <= len(self.reader.pages):
-            del self.writer.pages[skip_page]
-            with open(filename, "wb") as fp:
-                self.writer.write(fp)
-            self.load_pdf(filename)  # load updated file
-        else:
+        if not 0 <= skip_page < self.number_of_pages:
             return f'Page {skip_page + 1} not available.'
+        self.edit_pages(filename, ("delete", [skip_page]), pdf_meta)
+        if self.journal:
+            self.journal.record("delete", pages=[skip_page])
         return f'Page {skip_page + 1} deleted from document.'
 
     def export_page(self, filename, export_name, page, pdf_meta) -> str:
@@ -108,72 +932,531 @@ class PdfTools:
         :param pdf_meta:
         :return: Success/fail message.
         """
-        page_to_export = self.reader.pages[page]
-        export_pdf = PdfWriter()
-        export_pdf.add_page(page_to_export)
-        export_pdf.add_metadata(pdf_meta)
+        def export():
+            export_pdf = PdfWriter()
+            export_pdf.add_page(self.reader.pages[page])
+            export_pdf.add_metadata(pdf_meta)
+            self.write_pdf(export_pdf, export_name, "extract")
         try:
-            with open(export_name, "wb") as fp:
-                export_pdf.write(fp)
+            self.cached_outputs("extract", [filename], {"page": page, "meta": pdf_meta}, [export_name], export)
             return f'Page {page} has been exported.'
         except FileNotFoundError as e:
             return f'No export name selected. {e}'
 
+    def extract_pages(self, filename, export_name, page_ranges, pdf_meta) -> str:
+        """
+        Export several pages into one file in a single pass. Resources shared by the pages, e.g. fonts
+        and images, are written once.
+        :param filename:
+        :param export_name:
+        :param page_ranges: page range expression, see parse_page_ranges
+        :param pdf_meta:
+        :return: Success/fail message.
+        """
+        reader = self.open_reader(filename)
+        try:
+            pages = parse_page_ranges(page_ranges, len(reader.pages))
+        except ValueError as e:
+            return str(e)
+        if not pages:
+            return f'No pages to export.'
+
+        def export():
+            export_pdf = PdfWriter()
+            for page in pages:
+                export_pdf.add_page(reader.pages[page])
+            export_pdf.add_metadata(pdf_meta)
+            self.write_pdf(export_pdf, export_name, "extract_pages")
+        try:
+            self.cached_outputs("extract_pages", [filename], {"pages": pages, "meta": pdf_meta}, [export_name],
+                                export)
+        except FileNotFoundError as e:
+            return f'No export name selected. {e}'
+        return f'{len(pages)} pages have been exported.'
+
     def rotate_page(self, filename, page, degree):
         """
         Rotate PDF page by multiple of 90 degrees. Negative values for left rotation, positive values for
         right rotation.
-
-        Reads the entire document and writes it in new document, rotates single page.
-        This procedure is required to update views in single and multi-page mode.
         :param filename:
         :param page:
         :param degree:
         :return: filename
         """
-        if filename:
-            self.load_pdf(filename)
-        else:
+        return self.rotate_pages(filename, {page: degree})
+
+    def rotate_pages(self, filename, rotations):
+        """
+        Rotate several PDF pages by multiples of 90 degrees in one pass.
+
+        The rotation is applied to the page model and the document is written anew from it.
+        This procedure is required to update views in single and multi-page mode.
+        :param filename:
+        :param rotations: dict of page number to degree
+        :return: filename
+        """
+        if not filename:
             return f'No file chosen.'
-        self.writer = PdfWriter()
-        # add all pages from reader to new file and rotate one page
-        self.writer.append_pages_from_reader(self.reader)
-        self.writer.pages[page].rotate(degree)
-        with open(filename, "wb") as fp:
-            self.writer.write(fp)
+        model = self.current_model(filename)
+        # the document may not have been loaded, e.g. by the HTTP service
+        number_of_pages = len(model.pages) if model is not None else len(self.open_reader(filename).pages)
+        missing = [page for page in rotations if not 0 <= page < number_of_pages]
+        if missing:
+            return f'Page {missing[0] + 1} not available.'
+        self.edit_pages(filename, ("rotate", rotations))
+        if self.journal:
+            self.journal.record("rotate", pages=rotations)
         return filename
 
     def save_pdf(self, filename, save_filename, pdf_meta) -> str:
         """
-        Save PDF document with changes.
+        Save PDF document with changes. The working document already holds all edits, so it is copied as is.
+        Changed metadata is appended as an incremental update, pages are not rewritten. Only files that can
+        not be updated incrementally, e.g. encrypted files, are written anew, as are all files if object
+        streams are configured for saving.
         :param filename:
         :param save_filename:
         :param pdf_meta:
         :return: Message about success or failure.
         """
-        self.save_writer = PdfWriter()
-        self.save_writer.append_pages_from_reader(PdfReader(filename))
-        self.save_writer.add_metadata(pdf_meta)
+        if not save_filename:
+            return f'File not specified. Try again.'
+        in_memory = self.working_data is not None and filename == self.working_name
+        file_size = len(self.working_data) if in_memory else os.path.getsize(filename)
+        update = None if self.objects_per_stream("save") else info_update(self.open_reader(filename), file_size,
+                                                                          pdf_meta)
         try:
-            with open(save_filename, "wb") as fp:
-                self.save_writer.write(fp)
+            if update is None:
+                self.save_writer = PdfWriter()
+                self.save_writer.append_pages_from_reader(self.open_reader(filename))
+                self.save_writer.add_metadata(pdf_meta)
+                self.write_pdf(self.save_writer, save_filename, "save")
+            else:
+                part_filename = save_filename + '.part'
+                if in_memory:
+                    with open(part_filename, "wb") as fp:
+                        fp.write(self.working_data)
+                elif not reflink(filename, part_filename):
+                    shutil.copyfile(filename, part_filename)
+                with open(part_filename, "ab") as fp:
+                    fp.write(update)
+                os.replace(part_filename, save_filename)
+                self.reader_cache.invalidate(save_filename)
         except FileNotFoundError as e:
             return f'File not specified. Try again. {e}'
+        if self.journal:
+            # the saved file is the new starting point for recovery, the page model and its undo history
+            # stay, a model with history is journaled with a copy of its source
+            self.journal.discard()
+            self.journal = Journal(save_filename)
+            model = self.current_model(filename)
+            if model is not None and (model.undo_stack or model.redo_stack):
+                source = self.journal.path + '.source'
+                self.write_model_source(model, source)
+                self.journal.record("model", source=source, **model.state())
         return f'Saving file successful.'
 
-    def split_file(self, folder) -> str:
+    def split_file(self, folder, filename=None) -> str:
         """
-        Split document into single pages.
+        Split document into single pages. If the file name of the document is given, the pages are
+        served from the output cache when available.
         :param folder:
+        :param filename: file of the loaded document
         :return: Message about success or failure.
         """
-        if self.reader:
-            for page in range(len(self.reader.pages)):
-                filename = os.path.join(folder, f'Page_{page}.pdf')
+        if not self.reader:
+            return f'No document to split.'
+        outputs = [os.path.join(folder, f'Page_{page}.pdf') for page in range(len(self.reader.pages))]
+
+        def split():
+            for page, export_name in enumerate(outputs):
                 self.writer = PdfWriter()
                 self.writer.add_page(self.reader.pages[page])
-                with open(filename, 'wb') as fp:
-                    self.writer.write(fp)
+                self.write_pdf(self.writer, export_name, "split")
+        if filename:
+            self.cached_outputs("split", [filename], {}, outputs, split)
         else:
-            return f'No document to split.'
+            split()
         return f'Document split completed.'
+
+    def export_text(self, filename, output=None, workers=None, max_pending=None) -> str:
+        """
+        Export plain text of all pages. Pages are extracted in a process pool and written in page order
+        as soon as they are available. At most max_pending chunks are in flight, which bounds the reorder
+        buffer and keeps memory flat regardless of the page count.
+        :param filename:
+        :param output: text file name, None or '-' for stdout
+        :param workers: number of processes, defaults to the number of CPUs
+        :param max_pending: number of chunks in flight, defaults to twice the number of workers
+        :return: Message about success or failure with pages per second.
+        """
+        if not filename:
+            return f'No document to export.'
+        self.flush_working(filename)
+        number_of_pages = len(self.open_reader(filename).pages)
+        workers = workers or os.cpu_count() or 1
+        max_pending = max_pending or 2 * workers
+        start = time.perf_counter()
+        fp = None
+        try:
+            fp = sys.stdout if output in (None, '-') else open(output, "w", encoding="utf-8")
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = deque()
+                for first_page in range(0, number_of_pages, TEXT_CHUNK_PAGES):
+                    last_page = min(first_page + TEXT_CHUNK_PAGES, number_of_pages)
+                    pending.append(executor.submit(extract_text_chunk, filename, first_page, last_page))
+                    if len(pending) >= max_pending:
+                        self._write_text_chunk(fp, pending.popleft().result())
+                while pending:
+                    self._write_text_chunk(fp, pending.popleft().result())
+        except FileNotFoundError as e:
+            return f'No export name selected. {e}'
+        except (PermissionError, IsADirectoryError) as e:
+            return f'Text can not be written. {e}'
+        finally:
+            if fp is not None and fp is not sys.stdout:
+                fp.close()
+        duration = time.perf_counter() - start
+        self.text_export_stats = {"pages": number_of_pages, "seconds": duration,
+                                  "pages_per_second": number_of_pages / duration if duration else 0.0}
+        return f'Text of {number_of_pages} pages exported ({self.text_export_stats["pages_per_second"]:.1f} pages/s).'
+
+    @staticmethod
+    def _write_text_chunk(fp, texts):
+        for text in texts:
+            fp.write(text)
+            # form feed separates pages, as in pdftotext output
+            fp.write("\f")
+
+    def extract_images(self, filename, folder, workers=None) -> str:
+        """
+        Export all embedded images of the document into a folder without re-encoding them. Images are
+        streamed one by one, an image referenced from several pages is written only once.
+        :param filename:
+        :param folder:
+        :param workers: number of processes for parallel extraction, None extracts in this process
+        :return: Message about success or failure.
+        """
+        if not filename:
+            return f'No document to extract images from.'
+        self.flush_working(filename)
+        reader = self.open_reader(filename)
+        seen = set()
+        failed = 0
+        pending = deque()
+        executor = ProcessPoolExecutor(max_workers=workers) if workers else None
+        try:
+            for page_number, page in enumerate(reader.pages):
+                for path, ref in find_image_references(page.get("/Resources")):
+                    key = ref.idnum if isinstance(ref, IndirectObject) else (page_number, path)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    export_base = os.path.join(folder, f'Image_{len(seen):04d}_page_{page_number}')
+                    if executor:
+                        pending.append(executor.submit(extract_image, filename, page_number, path, export_base))
+                        if len(pending) >= 2 * workers:
+                            failed += self._image_result(pending.popleft())
+                    else:
+                        try:
+                            extract_image(filename, page_number, path, export_base)
+                        except (ImportError, ValueError, NotImplementedError):
+                            failed += 1
+            while pending:
+                failed += self._image_result(pending.popleft())
+        finally:
+            if executor:
+                executor.shutdown()
+        if not seen:
+            return f'No images found in document.'
+        return f'{len(seen) - failed} images extracted, {failed} failed.'
+
+    @staticmethod
+    def _image_result(future) -> int:
+        try:
+            future.result()
+        except (ImportError, ValueError, NotImplementedError):
+            return 1
+        return 0
+
+    def page_hashes(self, filename, perceptual=False) -> list:
+        """
+        Compute one hash per page, cached per document. Content hashes find pages that are identical
+        in the file, perceptual hashes of a low resolution render also find pages scanned twice.
+        :param filename:
+        :param perceptual: hash a 24 dpi render instead of the page content
+        :return: list of hashes in page order
+        """
+        self.flush_working(filename)
+        key = (readercache.ReaderCache.file_key(filename), perceptual)
+        if key in page_hash_cache:
+            page_hash_cache.move_to_end(key)
+        else:
+            if perceptual:
+                document = raster.load_document(filename)
+                hashes = [raster.difference_hash(raster.render_page(document, page, 24))
+                          for page in range(document.pageCount())]
+                document.close()
+            else:
+                hashes = [page_content_hash(page) for page in self.open_reader(filename).pages]
+            page_hash_cache[key] = hashes
+            while len(page_hash_cache) > PAGE_HASH_DOCUMENTS:
+                page_hash_cache.popitem(last=False)
+        return page_hash_cache[key]
+
+    def find_duplicate_pages(self, filename, perceptual=False) -> list:
+        """
+        Group pages with equal content hashes, or similar perceptual hashes, see perceptual_groups.
+        :param filename:
+        :param perceptual:
+        :return: list of groups of page numbers, each with more than one page
+        """
+        if perceptual:
+            return perceptual_groups(self.page_hashes(filename, perceptual))
+        groups = {}
+        for page, page_hash in enumerate(self.page_hashes(filename, perceptual)):
+            groups.setdefault(page_hash, []).append(page)
+        return [pages for pages in groups.values() if len(pages) > 1]
+
+    def remove_duplicate_pages(self, filename, pdf_meta, perceptual=False) -> str:
+        """
+        Remove all but the first page of each group of duplicates and write the document once.
+        :param filename:
+        :param pdf_meta:
+        :param perceptual:
+        :return: Message about success or failure.
+        """
+        duplicates = {page for pages in self.find_duplicate_pages(filename, perceptual) for page in pages[1:]}
+        if not duplicates:
+            return f'No duplicate pages found.'
+        self.delete_pages(filename, duplicates, pdf_meta)
+        return f'{len(duplicates)} duplicate pages removed from document.'
+
+    def find_blank_pages(self, filename, max_coverage=0.002, dpi=30, workers=None) -> list:
+        """
+        Detect blank pages by rendering each page at low resolution and scoring its ink coverage.
+        Page ranges are scored in parallel worker processes.
+        :param filename:
+        :param max_coverage: pages with at most this fraction of dark pixels are reported
+        :param dpi: render resolution
+        :param workers: number of processes, defaults to the number of CPUs
+        :return: list of (page, coverage) of blank page candidates
+        """
+        if raster.np is None:
+            # fail before starting workers, which would each fail the same way
+            raise ImportError('Blank page detection requires numpy.')
+        self.flush_working(filename)
+        number_of_pages = len(self.open_reader(filename).pages)
+        workers = workers or os.cpu_count() or 1
+        chunk = max(1, -(-number_of_pages // workers))
+        with render_pool(workers) as executor:
+            futures = [executor.submit(raster.score_pages, filename, range(first, min(first + chunk, number_of_pages)),
+                                       dpi) for first in range(0, number_of_pages, chunk)]
+            scores = [score for future in futures for score in future.result()]
+        return [(page, coverage) for page, coverage in scores if coverage <= max_coverage]
+
+    def delete_pages(self, filename, pages, pdf_meta) -> str:
+        """
+        Delete several pages from document in one pass.
+        :param filename:
+        :param pages: page numbers to delete
+        :param pdf_meta:
+        :return: Info about operation.
+        """
+        pages = set(pages)
+        if not pages:
+            return f'No pages to delete.'
+        self.edit_pages(filename, ("delete", sorted(pages)), pdf_meta)
+        if self.journal:
+            self.journal.record("delete", pages=sorted(pages))
+        return f'{len(pages)} pages deleted from document.'
+
+    def export_page_images(self, filename, output, dpi=150, image_format="PNG", pages=None, workers=None,
+                           rasterizer=raster.qt_rasterizer) -> str:
+        """
+        Render pages to images. Page ranges are rendered and encoded in worker processes and streamed
+        to a folder or, if output ends with .zip, into a ZIP archive.
+        :param filename:
+        :param output: folder or .zip file name
+        :param dpi: render resolution
+        :param image_format: "PNG", "JPEG" or "TIFF"
+        :param pages: page numbers, defaults to all pages
+        :param workers: number of processes, defaults to the number of CPUs
+        :param rasterizer: rasterizer factory, see raster.qt_rasterizer
+        :return: Message about success or failure.
+        """
+        image_format = image_format.upper()
+        if image_format not in IMAGE_FORMATS:
+            return f'Image format {image_format} not supported.'
+        self.flush_working(filename)
+        if pages is None:
+            pages = range(len(self.open_reader(filename).pages))
+        pages = list(pages)
+        archive = zipfile.ZipFile(output, "w", zipfile.ZIP_STORED) if output.lower().endswith('.zip') else None
+        folder = None if archive else output
+        workers = workers or os.cpu_count() or 1
+        start = time.perf_counter()
+        try:
+            with render_pool(workers) as executor:
+                pending = deque()
+                for first in range(0, len(pages), RENDER_CHUNK_PAGES):
+                    pending.append(executor.submit(raster.render_range, filename, pages[first:first + RENDER_CHUNK_PAGES],
+                                                   dpi, image_format, folder, rasterizer))
+                    if len(pending) >= 2 * workers:
+                        self._store_images(archive, image_format, pending.popleft().result())
+                while pending:
+                    self._store_images(archive, image_format, pending.popleft().result())
+        finally:
+            if archive:
+                archive.close()
+        duration = time.perf_counter() - start
+        return f'{len(pages)} pages exported at {dpi} dpi ({len(pages) / duration:.1f} pages/s).'
+
+    @staticmethod
+    def _store_images(archive, image_format, results):
+        if archive:
+            for page, data in results:
+                archive.writestr(raster.image_name(page, image_format), data)
+
+    def stamp(self, filename, text, pdf_meta, pages=None, font_size=72, opacity=0.3) -> str:
+        """
+        Stamp text diagonally across pages. The stamp is built once as a Form XObject and referenced from
+        every target page, the page content is wrapped by small shared streams instead of being rewritten.
+        :param filename:
+        :param text: stamp text, e.g. "COPY"
+        :param pdf_meta:
+        :param pages: page numbers, defaults to all pages
+        :param font_size:
+        :param opacity: fill opacity between 0 and 1
+        :return: Message about success or failure.
+        """
+        if not filename:
+            return f'No file chosen.'
+        self.writer = PdfWriter()
+        self.writer.append_pages_from_reader(self.open_reader(filename))
+        self.writer.add_metadata(pdf_meta)
+        targets = apply_stamp(self.writer, text, pages, font_size, opacity)
+        if self.journal:
+            self.journal.record("stamp", text=text, pages=targets, font_size=font_size, opacity=opacity)
+        self.commit_pdf(self.writer, filename)
+        # the stamped pages are the new base for page edits
+        self.page_model = None
+        self.load_pdf(filename)
+        return f'Stamp "{text}" added to {len(targets)} pages.'
+
+    def split_by_outline(self, filename, folder, workers=None) -> str:
+        """
+        Split document into one file per top-level bookmark. Page ranges are computed once from the
+        outline, each output keeps the bookmarks below its chapter. Pages before the first bookmark
+        go into a separate front matter file.
+        :param filename:
+        :param folder:
+        :param workers: number of processes for writing chunks in parallel, None writes in this process
+        :return: Message about success or failure.
+        """
+        reader = self.open_reader(filename)
+        chapters = sorted(outline_tree(reader, reader.outline), key=lambda chapter: chapter[1])
+        if not chapters:
+            return f'Document has no bookmarks to split by.'
+        number_of_pages = len(reader.pages)
+        if chapters[0][1] > 0:
+            chapters.insert(0, ('Front matter', 0, []))
+        chunks = []
+        for index, (title, first_page, children) in enumerate(chapters):
+            last_page = chapters[index + 1][1] if index + 1 < len(chapters) else number_of_pages
+            if last_page <= first_page:
+                continue
+            export_name = os.path.join(folder, f'{len(chunks) + 1:02d}_{safe_filename(title)}.pdf')
+            outline = [(title, 0, self._shift_outline(children, first_page, last_page))]
+            chunks.append((filename, export_name, first_page, last_page, outline))
+        self._write_chunks(chunks, workers)
+        return f'Document split into {len(chunks)} files by bookmarks.'
+
+    @staticmethod
+    def _shift_outline(outline, first_page, last_page) -> list:
+        # keep only bookmarks pointing into the chunk, with page numbers relative to its start
+        return [(title, page - first_page, PdfTools._shift_outline(children, first_page, last_page))
+                for title, page, children in outline if first_page <= page < last_page]
+
+    def _write_chunks(self, chunks, workers):
+        if not chunks:
+            return
+
+        objects_per_stream = self.objects_per_stream("split_range")
+
+        def write():
+            self.flush_working(chunks[0][0])
+            if workers:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    for future in [executor.submit(write_page_range, *chunk, objects_per_stream=objects_per_stream)
+                                   for chunk in chunks]:
+                        future.result()
+            else:
+                for chunk in chunks:
+                    write_page_range(*chunk, objects_per_stream=objects_per_stream)
+        # chunks are (filename, export name, first page, last page, ...), the key uses the page ranges
+        params = [[os.path.basename(chunk[1]), *chunk[2:]] for chunk in chunks]
+        self.cached_outputs("split_range", [chunks[0][0]], params, [chunk[1] for chunk in chunks], write)
+
+    def find_separator_pages(self, filename, pattern) -> list:
+        """
+        Find separator sheets by matching a regular expression against the text of each page.
+        Pages are extracted one at a time, only the page numbers of matches are kept.
+        :param filename:
+        :param pattern: regular expression
+        :return: list of separator page numbers
+        """
+        regex = re.compile(pattern)
+        return self.cached_result("separators", [filename], {"pattern": pattern}, lambda: [
+            page_number for page_number, page in enumerate(self.open_reader(filename).pages)
+            if regex.search(page.extract_text() or '')])
+
+    def split_by_separator(self, filename, folder, pattern, dry_run=False, workers=None) -> str:
+        """
+        Split document at separator pages. Separator pages are dropped, every segment between them
+        is written to its own file.
+        :param filename:
+        :param folder:
+        :param pattern: regular expression matching the text of separator pages
+        :param dry_run: only report the detected boundaries
+        :param workers: number of processes for writing segments in parallel, None writes in this process
+        :return: Report of the detected segments or message about success or failure.
+        """
+        try:
+            separators = self.find_separator_pages(filename, pattern)
+        except re.error as e:
+            return f'Invalid separator pattern. {e}'
+        number_of_pages = len(self.open_reader(filename).pages)
+        segments = []
+        first_page = 0
+        for separator in separators + [number_of_pages]:
+            if separator > first_page:
+                segments.append((first_page, separator))
+            first_page = separator + 1
+        if dry_run:
+            report = [f'Separator pages: {", ".join(str(page + 1) for page in separators) or "none"}']
+            report += [f'Segment {index + 1}: pages {first + 1}-{last}' for index, (first, last) in enumerate(segments)]
+            return '\n'.join(report)
+        if not separators:
+            return f'No separator pages found.'
+        chunks = [(filename, os.path.join(folder, f'Segment_{index + 1:03d}.pdf'), first, last)
+                  for index, (first, last) in enumerate(segments)]
+        self._write_chunks(chunks, workers)
+        return f'Document split into {len(chunks)} files at {len(separators)} separator pages.'
+
+    def replay_journal(self, journal, filename, pdf_meta=None) -> str:
+        """
+        Rebuild the working document of an earlier session. All journaled operations are applied to a
+        page model of the original file, the result is written once. The undo history is recovered as well.
+        :param journal: Journal
+        :param filename: working copy to rebuild
+        :param pdf_meta:
+        :return: Message about success or failure.
+        """
+        model = PageModel(self.open_reader(journal.original))
+        for entry in journal.operations:
+            model = apply_operation(model, entry)
+        self.page_model = model
+        self.page_model_name = filename
+        self.commit_model(filename, pdf_meta)
+        return f'{len(journal.operations)} operations recovered.'
@@ -0,0 +1,173 @@
+"""
+Page rendering helpers built on QtPdf, usable inside the GUI and in headless worker processes.
+"""
+from PySide6.QtCore import QSize, QBuffer, QByteArray, QIODevice
+from PySide6.QtGui import QGuiApplication, QImage, QPainter
+from PySide6.QtPdf import QPdfDocument
+import os
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for blank page detection
+    np = None
+
+
+def ensure_application():
+    """
+    QtPdf needs a running QGuiApplication, create an offscreen one outside of the GUI.
+    :return: application instance
+    """
+    app = QGuiApplication.instance()
+    if app is None:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        app = QGuiApplication([])
+    return app
+
+
+def load_document(filename) -> QPdfDocument:
+    """
+    Load a document for rendering.
+    :param filename:
+    :return: QPdfDocument
+    """
+    ensure_application()
+    document = QPdfDocument(None)
+    document.load(filename)
+    return document
+
+
+def render_page(document, page, dpi, image_format=QImage.Format.Format_RGB32) -> QImage:
+    """
+    Render a page at the given resolution on a white background.
+    :param document: QPdfDocument
+    :param page: page number
+    :param dpi: resolution in dots per inch
+    :param image_format: QImage format of the result
+    :return: QImage
+    """
+    points = document.pagePointSize(page)
+    size = QSize(max(1, round(points.width() * dpi / 72)), max(1, round(points.height() * dpi / 72)))
+    image = document.render(page, size)
+    if image.hasAlphaChannel():
+        # pages without a background are transparent, flatten them onto white
+        flat = QImage(image.size(), QImage.Format.Format_RGB32)
+        flat.fill(0xFFFFFF)
+        painter = QPainter(flat)
+        painter.drawImage(0, 0, image)
+        painter.end()
+        image = flat
+    return image.convertToFormat(image_format)
+
+
+def qt_rasterizer(filename):
+    """
+    Default rasterizer. A rasterizer is a picklable factory taking a file name and returning
+    a function that renders (page, dpi) to a QImage.
+    :param filename:
+    :return: render function
+    """
+    document = load_document(filename)
+
+    def render(page, dpi):
+        return render_page(document, page, dpi)
+    return render
+
+
+def encode_image(image, image_format, quality=-1) -> bytes:
+    """
+    Encode an image in memory.
+    :param image: QImage
+    :param image_format: "PNG", "JPEG" or "TIFF"
+    :param quality: encoder quality 0-100, -1 for the default
+    :return: encoded bytes
+    """
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    image.save(buffer, image_format, quality)
+    buffer.close()
+    return data.data()
+
+
+def render_range(filename, pages, dpi, image_format, folder=None, rasterizer=qt_rasterizer) -> list:
+    """
+    Render and encode a range of pages. Runs in worker processes. With a folder the images are
+    written there directly, otherwise the encoded bytes are returned.
+    :param filename:
+    :param pages: page numbers
+    :param dpi: render resolution
+    :param image_format: "PNG", "JPEG" or "TIFF"
+    :param folder: output folder or None
+    :param rasterizer: rasterizer factory, see qt_rasterizer
+    :return: list of (page, written file name or encoded bytes)
+    """
+    ensure_application()
+    render = rasterizer(filename)
+    results = []
+    for page in pages:
+        data = encode_image(render(page, dpi), image_format)
+        if folder:
+            export_name = os.path.join(folder, image_name(page, image_format))
+            with open(export_name, "wb") as fp:
+                fp.write(data)
+            results.append((page, export_name))
+        else:
+            results.append((page, data))
+    return results
+
+
+def image_name(page, image_format) -> str:
+    extension = {"JPEG": "jpg", "TIFF": "tif"}.get(image_format, image_format.lower())
+    return f'Page_{page}.{extension}'
+
+
+def difference_hash(image) -> int:
+    """
+    64-bit difference hash of an image. Similar looking pages get hashes differing in a few bits. The hash
+    only sees brightness gradients, uniform images of any color hash to 0.
+    :param image: QImage
+    :return: hash as int
+    """
+    small = image.convertToFormat(QImage.Format.Format_Grayscale8).scaled(9, 8)
+    value = 0
+    for y in range(8):
+        for x in range(8):
+            value = (value << 1) | (small.pixelColor(x, y).value() > small.pixelColor(x + 1, y).value())
+    return value
+
+
+def ink_coverage(image, threshold=200, margin=0.05) -> float:
+    """
+    Fraction of dark pixels on a page render. A border of the given relative width is ignored,
+    scanner edges and punch holes would otherwise count as ink.
+    :param image: QImage
+    :param threshold: gray values below are counted as ink
+    :param margin: relative width of the ignored border
+    :return: coverage between 0 and 1
+    """
+    if np is None:
+        raise ImportError('Blank page detection requires numpy.')
+    gray = image.convertToFormat(QImage.Format.Format_Grayscale8)
+    width, height = gray.width(), gray.height()
+    # rows of a QImage are padded to 32 bit, slice the padding off
+    pixels = np.frombuffer(gray.constBits(), dtype=np.uint8, count=gray.bytesPerLine() * height)
+    pixels = pixels.reshape(height, gray.bytesPerLine())[:, :width]
+    border_x, border_y = int(width * margin), int(height * margin)
+    inner = pixels[border_y:height - border_y, border_x:width - border_x]
+    if inner.size == 0:
+        return 0.0
+    return float(np.count_nonzero(inner < threshold)) / inner.size
+
+
+def score_pages(filename, pages, dpi) -> list:
+    """
+    Ink coverage of a list of pages. Runs in worker processes, each loading its own document.
+    :param filename:
+    :param pages: page numbers
+    :param dpi: render resolution
+    :return: list of (page, coverage)
+    """
+    document = load_document(filename)
+    scores = [(page, ink_coverage(render_page(document, page, dpi))) for page in pages]
+    document.close()
+    return scores
@@ -0,0 +1,120 @@
+from collections import OrderedDict
+import threading
+import os
+
+from pypdf import PdfReader
+
+import pdfindex
+
+# Rough factor between file size and memory held by a parsed reader (raw bytes plus parsed objects).
+READER_OVERHEAD = 2
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class ReaderCache:
+    """
+    Process-wide LRU cache of parsed PdfReader objects. Files are opened through their persistent index
+    if one exists. Entries are keyed by file identity (device, inode,
+    modification time and size), so a file that changed on disk is parsed again instead of being served
+    from the cache. Eviction is bounded by the estimated memory of the cached readers.
+    """
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._readers = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def file_key(filename):
+        """
+        Build the identity key for a file.
+        :param filename:
+        :return: tuple of device, inode, mtime and size
+        """
+        stat = os.stat(filename)
+        return stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def get(self, filename) -> PdfReader:
+        """
+        Return a parsed reader for the file, parsing it only if no current entry exists.
+        :param filename:
+        :return: PdfReader
+        """
+        key = self.file_key(filename)
+        with self._lock:
+            entry = self._readers.get(key)
+            if entry is not None:
+                self._readers.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        reader = pdfindex.open_reader(filename)
+        size = key[3] * READER_OVERHEAD
+        with self._lock:
+            if key not in self._readers:
+                self._readers[key] = (reader, size, os.path.abspath(filename))
+                self.current_bytes += size
+                self._evict()
+        return reader
+
+    def _evict(self):
+        # Keep at least the newest entry, even if it exceeds the budget on its own.
+        while self.current_bytes > self.max_bytes and len(self._readers) > 1:
+            _, (_, size, _) = self._readers.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
+
+    def invalidate(self, filename):
+        """
+        Drop all entries loaded from the given path. Called after a file has been written.
+        :param filename:
+        :return: None
+        """
+        path = os.path.abspath(filename)
+        with self._lock:
+            for key in [key for key, entry in self._readers.items() if entry[2] == path]:
+                self.current_bytes -= self._readers.pop(key)[1]
+                self.invalidations += 1
+
+    def memory(self, filename) -> int:
+        """
+        Estimated memory of the readers cached for the given path.
+        :param filename:
+        :return: bytes
+        """
+        path = os.path.abspath(filename)
+        with self._lock:
+            return sum(size for _, size, entry_path in self._readers.values() if entry_path == path)
+
+    def clear(self):
+        """
+        Drop all cached readers.
+        :return: None
+        """
+        with self._lock:
+            self._readers.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        """
+        Hit/miss statistics of the cache.
+        :return: dict with entries, memory estimate, hits, misses and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self._readers),
+                    "bytes": self.current_bytes,
+                    "max_bytes": self.max_bytes,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions,
+                    "invalidations": self.invalidations,
+                    "hit_rate": self.hits / lookups if lookups else 0.0,
+                    }
+
+
+reader_cache = ReaderCache()
@@ -0,0 +1,110 @@
+# This Python file uses the following encoding: utf-8
+"""
+Fast metadata and page-count scanner for whole directories of PDF files.
+
+Only the header, trailer, cross-reference data, the /Info dictionary and the /Count of the
+page tree root are read for each file. The page tree itself is never walked.
+
+Run with: python scanner.py FOLDER [--format csv|jsonl] [--output FILE] [--workers N]
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import csv
+import json
+import os
+import sys
+
+from pypdf import PdfReader
+
+FIELDS = ("path", "size", "version", "pages", "title", "author", "creator", "subject", "producer", "error")
+INFO_FIELDS = {"title": "/Title", "author": "/Author", "creator": "/Creator", "subject": "/Subject",
+               "producer": "/Producer"}
+
+
+def scan_file(path) -> dict:
+    """
+    Read version, page count and document information of a single file.
+    :param path:
+    :return: dict with one value per entry of FIELDS
+    """
+    record = dict.fromkeys(FIELDS, "")
+    record["path"] = path
+    try:
+        record["size"] = os.path.getsize(path)
+        # Passing an open file keeps pypdf from reading the whole document into memory,
+        # objects are only read from disk when they are resolved.
+        with open(path, "rb") as fp:
+            reader = PdfReader(fp)
+            record["version"] = reader.pdf_header.replace('%PDF-', '')
+            record["pages"] = int(reader.trailer["/Root"]["/Pages"]["/Count"])
+            info = reader.metadata or {}
+            for field, key in INFO_FIELDS.items():
+                value = info.get(key)
+                record[field] = str(value) if value is not None else ""
+    except Exception as e:
+        record["error"] = str(e)
+    return record
+
+
+def find_pdf_files(folder):
+    """
+    Yield all PDF files below the folder.
+    :param folder:
+    :return: generator of file paths
+    """
+    for root, _, files in os.walk(folder):
+        for name in sorted(files):
+            if name.lower().endswith('.pdf'):
+                yield os.path.join(root, name)
+
+
+def scan_folder(folder, workers=None):
+    """
+    Scan all PDF files below the folder in parallel.
+    :param folder:
+    :param workers: number of processes, defaults to the number of CPUs
+    :return: generator of records in file order
+    """
+    paths = list(find_pdf_files(folder))
+    if workers == 1:
+        yield from map(scan_file, paths)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(scan_file, paths, chunksize=64)
+
+
+def write_records(records, fp, output_format="csv"):
+    """
+    Write scan records as CSV or JSON lines.
+    :param records:
+    :param fp: text file object
+    :param output_format: "csv" or "jsonl"
+    :return: number of records written
+    """
+    count = 0
+    if output_format == "csv":
+        writer = csv.DictWriter(fp, fieldnames=FIELDS)
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            count += 1
+    else:
+        for record in records:
+            fp.write(json.dumps(record) + "\n")
+            count += 1
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan PDF metadata and page counts of a folder")
+    parser.add_argument("folder")
+    parser.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    parser.add_argument("--output", help="output file, defaults to stdout")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    scanned = scan_folder(args.folder, args.workers)
+    if args.output:
+        with open(args.output, "w", newline="") as out:
+            write_records(scanned, out, args.format)
+    else:
+        write_records(scanned, sys.stdout, args.format)
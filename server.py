@@ -0,0 +1,202 @@
+# This Python file uses the following encoding: utf-8
+"""
+Local HTTP service exposing the PdfTools operations. Parsed documents are kept in a warm
+reader pool, so repeated requests on the same file skip parsing.
+
+Run with: python server.py [--host 127.0.0.1] [--port 8765] [--object-streams 100]
+
+All operation endpoints take a JSON body via POST and answer with JSON:
+    /merge    {"files": [file1, file2], "output": path}
+    /split    {"file": path, "folder": path}
+    /rotate   {"file": path, "page": 0, "degree": 90}
+    /delete   {"file": path, "page": 0}
+    /extract  {"file": path, "page": 0, "output": path}
+    /info     {"file": path}
+GET /metrics returns reader pool hit rates and latency histograms per endpoint.
+"""
+from http.server import HTTPServer, BaseHTTPRequestHandler
+import argparse
+import bisect
+import json
+import os
+import shutil
+import time
+
+from pypdf.errors import PdfReadError
+
+import pdftools
+import readercache
+
+# Upper bounds of the latency histogram buckets in milliseconds, last bucket catches everything above.
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram for a single endpoint.
+    """
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+        self.requests = 0
+
+    def observe(self, duration_ms):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, duration_ms)] += 1
+        self.total_ms += duration_ms
+        self.requests += 1
+
+    def to_dict(self) -> dict:
+        labels = [f'le_{bound}' for bound in LATENCY_BUCKETS_MS] + ['le_inf']
+        return {"requests": self.requests,
+                "mean_ms": self.total_ms / self.requests if self.requests else 0.0,
+                "buckets": dict(zip(labels, self.counts)),
+                }
+
+
+class PdfService:
+    """
+    Operations offered by the HTTP server, built on a single PdfTools instance using the process-wide reader cache.
+    """
+    def __init__(self):
+        self.reader_cache = readercache.reader_cache
+        self.pdf_tools = pdftools.PdfTools()
+        # clients read the results from disk, never keep edited documents in memory only
+        self.pdf_tools.memory_limit = 0
+        self.latency = {}
+
+    def metadata(self, filename) -> dict:
+        self.pdf_tools.load_pdf(filename)
+        return {key: str(value) for key, value in (self.pdf_tools.reader.metadata or {}).items()}
+
+    def merge(self, params) -> dict:
+        file1, file2 = params["files"]
+        merged = self.pdf_tools.append_file(file1, file2)
+        shutil.copyfile(merged, params["output"])
+        return {"message": f'Merged files into {params["output"]}.'}
+
+    def split(self, params) -> dict:
+        self.pdf_tools.load_pdf(params["file"])
+        return {"message": self.pdf_tools.split_file(params["folder"], params["file"])}
+
+    def page(self, params) -> int:
+        """
+        Page number of a request, checked against the document loaded by metadata(). Invalid requests
+        raise ValueError and are answered with 400 instead of a success message.
+        :param params:
+        :return: page number
+        """
+        page = int(params["page"])
+        if not 0 <= page < self.pdf_tools.number_of_pages:
+            raise ValueError(f'Page {page + 1} not available.')
+        return page
+
+    def rotate(self, params) -> dict:
+        self.metadata(params["file"])
+        page = self.page(params)
+        degree = int(params.get("degree", 90))
+        if degree % 90:
+            raise ValueError(f'Rotation by {degree} degrees not supported, use multiples of 90.')
+        self.pdf_tools.rotate_page(params["file"], page, degree)
+        return {"message": f'Page {page + 1} rotated.'}
+
+    def delete(self, params) -> dict:
+        pdf_meta = self.metadata(params["file"])
+        return {"message": self.pdf_tools.delete_page(params["file"], self.page(params), pdf_meta)}
+
+    def extract(self, params) -> dict:
+        pdf_meta = self.metadata(params["file"])
+        page = self.page(params)
+        folder = os.path.dirname(os.path.abspath(params["output"]))
+        if not os.path.isdir(folder):
+            raise ValueError(f'Output folder {folder} does not exist.')
+        return {"message": self.pdf_tools.export_page(params["file"], params["output"], page, pdf_meta)}
+
+    def info(self, params) -> dict:
+        pdf_meta = self.metadata(params["file"])
+        return {"pages": self.pdf_tools.number_of_pages,
+                "version": self.pdf_tools.pdf_version,
+                "metadata": pdf_meta,
+                }
+
+    def metrics(self) -> dict:
+        return {"reader_cache": self.reader_cache.stats(),
+                "temp_storage_bytes": self.pdf_tools.temp_storage.usage(),
+                "output_cache": self.pdf_tools.output_cache.stats(),
+                "latency": {endpoint: hist.to_dict() for endpoint, hist in self.latency.items()},
+                }
+
+    def record(self, endpoint, duration_ms):
+        self.latency.setdefault(endpoint, LatencyHistogram()).observe(duration_ms)
+
+
+class PdfRequestHandler(BaseHTTPRequestHandler):
+    service = None
+    operations = ("merge", "split", "rotate", "delete", "extract", "info")
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self.send_json(200, self.service.metrics())
+        else:
+            self.send_json(404, {"error": f'Unknown endpoint {self.path}.'})
+
+    def do_POST(self):
+        endpoint = self.path.strip("/")
+        if endpoint not in self.operations:
+            self.send_json(404, {"error": f'Unknown endpoint {self.path}.'})
+            return
+        start = time.perf_counter()
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            params = json.loads(self.rfile.read(length) or b"{}")
+            status, payload = 200, getattr(self.service, endpoint)(params)
+        except FileNotFoundError as e:
+            status, payload = 404, {"error": f'File not found: {e.filename}'}
+        except PermissionError as e:
+            status, payload = 403, {"error": f'Permission denied: {e.filename}'}
+        except (KeyError, ValueError, TypeError, PdfReadError) as e:
+            status, payload = 400, {"error": f'Invalid request: {e}'}
+        except Exception as e:
+            status, payload = 500, {"error": str(e)}
+        self.service.record(endpoint, (time.perf_counter() - start) * 1000)
+        self.send_json(status, payload)
+
+
+def run(host="127.0.0.1", port=8765, cache_mb=512, object_streams=0):
+    """
+    Start the HTTP server and serve until interrupted.
+    :param host:
+    :param port:
+    :param cache_mb: memory budget of the reader cache in MB
+    :param object_streams: objects per object stream in written files, 0 for classic files
+    :return: None
+    """
+    readercache.reader_cache.max_bytes = cache_mb * 1024 * 1024
+    PdfRequestHandler.service = PdfService()
+    PdfRequestHandler.service.pdf_tools.object_streams["default"] = object_streams
+    httpd = HTTPServer((host, port), PdfRequestHandler)
+    print(f'PDF-Tool service listening on http://{host}:{port}')
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PDF-Tool local HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cache-mb", type=int, default=512)
+    parser.add_argument("--object-streams", type=int, default=0,
+                        help="pack objects of written files into object streams of this size")
+    args = parser.parse_args()
+    run(args.host, args.port, args.cache_mb, args.object_streams)
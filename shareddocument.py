@@ -0,0 +1,143 @@
+"""
+One copy of a document's bytes for both PDF engines. pypdf reads a file into memory on its own and QtPdf
+reads the file again, so every open document was held twice. A SharedDocument maps the working copy
+into memory once, pypdf parses the mapping and QtPdf reads from the same mapping through a QIODevice.
+Documents held in memory by PdfTools are shared the same way without copying them into a QByteArray.
+"""
+from PySide6.QtCore import QIODevice
+from pypdf import PdfReader
+from io import BytesIO
+import hashlib
+import mmap
+import os
+
+from readercache import ReaderCache
+import pdfindex
+
+
+def map_file(filename):
+    """
+    Map a file read-only into memory. Only map files that are replaced instead of written into,
+    e.g. working copies, a mapped file that shrinks makes reads fail. Windows refuses to replace or
+    delete a mapped file, there the file is read into memory instead.
+    :param filename:
+    :return: mmap, bytes on Windows or for an empty file
+    """
+    with open(filename, "rb") as fp:
+        if os.name != 'posix':
+            return fp.read()
+        if os.fstat(fp.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class BufferDevice(QIODevice):
+    """
+    Read-only random access QIODevice over a bytes-like buffer, e.g. a mapped file.
+    """
+    def __init__(self, data, parent=None):
+        super().__init__(parent)
+        self.data = data
+        self.open(QIODevice.OpenModeFlag.ReadOnly)
+
+    def isSequential(self) -> bool:
+        return False
+
+    def size(self) -> int:
+        return len(self.data)
+
+    def readData(self, maxlen) -> bytes:
+        position = self.pos()
+        return bytes(self.data[position:position + maxlen])
+
+    def writeData(self, data) -> int:
+        return -1
+
+
+class SharedDocument:
+    """
+    Bytes of a document read once, with the pypdf reader parsed from them on first use and a cached
+    info record. Either a working copy on disk, mapped into memory, or an in-memory document.
+    """
+    def __init__(self, data, filename=None):
+        self.data = data
+        self.filename = filename
+        self.identity = ReaderCache.file_key(filename) if filename else None
+        self._reader = None
+        self._info = None
+        self._content_hash = None
+
+    @classmethod
+    def open(cls, filename):
+        """
+        Map a working copy on disk.
+        :param filename:
+        :return: SharedDocument
+        """
+        return cls(map_file(filename), filename)
+
+    def current(self, filename) -> bool:
+        """
+        Check that the document still stands for the file, working copies are replaced when written.
+        :param filename:
+        :return: True if the file is unchanged
+        """
+        return (self.filename == filename and os.path.exists(filename)
+                and ReaderCache.file_key(filename) == self.identity)
+
+    @property
+    def reader(self) -> PdfReader:
+        if self._reader is None:
+            stream = self.data if self.mapped else BytesIO(self.data)
+            if self.filename:
+                self._reader = pdfindex.open_reader(self.filename, stream)
+            else:
+                self._reader = PdfReader(stream)
+        return self._reader
+
+    @property
+    def parsed(self) -> bool:
+        return self._reader is not None
+
+    @property
+    def mapped(self) -> bool:
+        return isinstance(self.data, mmap.mmap)
+
+    @property
+    def content_hash(self) -> str:
+        """
+        SHA-256 of the document bytes, computed once.
+        :return: hex digest
+        """
+        if self._content_hash is None:
+            self._content_hash = hashlib.sha256(self.data).hexdigest()
+        return self._content_hash
+
+    def device(self, parent=None) -> BufferDevice:
+        """
+        Device for QPdfDocument.load reading the shared bytes. The device keeps the bytes alive,
+        even after the document has been replaced.
+        :param parent: QObject
+        :return: BufferDevice
+        """
+        return BufferDevice(self.data, parent)
+
+    @property
+    def info(self) -> dict:
+        """
+        Document information from the pypdf reader, gathered once.
+        :return: dict with page_count, version, metadata and page_sizes (width, height in points,
+            as displayed with the page rotation applied)
+        """
+        if self._info is None:
+            reader = self.reader
+            page_sizes = []
+            for page in reader.pages:
+                width, height = float(page.mediabox.width), float(page.mediabox.height)
+                page_sizes.append((height, width) if page.rotation % 180 else (width, height))
+            self._info = {"page_count": len(page_sizes),
+                          "version": reader.pdf_header.replace('%PDF-', ''),
+                          "metadata": {key: str(value) for key, value in (reader.metadata or {}).items()},
+                          "page_sizes": page_sizes,
+                          }
+        return self._info
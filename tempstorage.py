@@ -0,0 +1,132 @@
+import itertools
+import tempfile
+import shutil
+import os
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+# Linux ioctl to clone a file on copy-on-write filesystems (btrfs, xfs).
+FICLONE = 0x40049409
+DEFAULT_BUDGET = 2 * 1024 * 1024 * 1024
+
+
+def reflink(source, target) -> bool:
+    """
+    Clone a file on copy-on-write filesystems, the copy shares the data blocks of the source.
+    :param source:
+    :param target:
+    :return: False if the filesystem does not support reflinks
+    """
+    if fcntl is None:
+        return False
+    try:
+        with open(source, "rb") as src, open(target, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError:
+        if os.path.exists(target):
+            os.remove(target)
+        return False
+    shutil.copystat(source, target)
+    return True
+
+
+class TempStorage:
+    """
+    Managed temporary storage for working copies. Files get unique names in a private folder below a
+    configurable location (PDFTOOL_TMPDIR, e.g. a tmpfs mount). Files not in use are evicted oldest first
+    once the folder exceeds its size budget (PDFTOOL_TMP_BUDGET_MB). Copies are made as reflinks where the
+    filesystem supports it, files already in the storage are hard linked, so copies cost no extra disk space.
+    Hard links are safe because PdfTools replaces files instead of writing into them. Files from outside
+    are never hard linked, other programs may write into them.
+    """
+    def __init__(self, location=None, budget=None):
+        location = location or os.environ.get("PDFTOOL_TMPDIR") or None
+        if budget is None:
+            budget_mb = os.environ.get("PDFTOOL_TMP_BUDGET_MB")
+            budget = int(budget_mb) * 1024 * 1024 if budget_mb else DEFAULT_BUDGET
+        self.budget = budget
+        self.temp_folder = tempfile.TemporaryDirectory(prefix="pdftool-", dir=location)
+        self.active = set()
+        self.counter = itertools.count(1)
+
+    @property
+    def name(self) -> str:
+        return self.temp_folder.name
+
+    def new_file(self, prefix="temp") -> str:
+        """
+        Reserve a new, unique file name. The file counts as in use until released.
+        :param prefix:
+        :return: path
+        """
+        path = os.path.join(self.name, f'{prefix}_{next(self.counter)}.pdf')
+        self.active.add(path)
+        return path
+
+    def copy_in(self, path, prefix="temp_file") -> str:
+        """
+        Copy a file into the storage, as reflink or hard link if possible.
+        :param path:
+        :param prefix:
+        :return: path of the copy
+        """
+        copy_path = self.new_file(prefix)
+        if not reflink(path, copy_path) and not self._hard_link(path, copy_path):
+            shutil.copy2(path, copy_path)
+        self.evict()
+        return copy_path
+
+    def _hard_link(self, source, target) -> bool:
+        if os.path.dirname(os.path.abspath(source)) != os.path.abspath(self.name):
+            return False
+        try:
+            os.link(source, target)
+        except OSError:
+            return False
+        return True
+
+    def release(self, path):
+        """
+        Mark a file as no longer in use, it may be evicted from now on.
+        :param path:
+        :return: None
+        """
+        self.active.discard(path)
+
+    def _files(self) -> list:
+        entries = []
+        for entry in os.scandir(self.name):
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+    def evict(self):
+        """
+        Remove stale files, oldest first, until the storage fits its budget. Files in use are kept.
+        :return: number of evicted files
+        """
+        entries = sorted(self._files())
+        used = sum(size for _, _, size in entries)
+        evicted = 0
+        for _, path, size in entries:
+            if used <= self.budget:
+                break
+            if path not in self.active:
+                os.remove(path)
+                used -= size
+                evicted += 1
+        return evicted
+
+    def usage(self) -> int:
+        """
+        Disk space used by the storage. Hard linked files are counted with their full size.
+        :return: bytes
+        """
+        return sum(size for _, _, size in self._files())
+
+    def cleanup(self):
+        self.temp_folder.cleanup()